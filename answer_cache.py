@@ -0,0 +1,99 @@
+"""
+Semantic Answer Cache
+Reuses a previous Q&A answer when a new question is a close paraphrase of an
+earlier one (cosine similarity of the question embeddings) and retrieves
+exactly the same chunks, so the LLM call can be skipped.
+"""
+
+import threading
+from typing import List, Optional, Dict
+
+import faiss
+import numpy as np
+
+
+class SemanticAnswerCache:
+    """
+    Small FAISS inner-product index over normalised question vectors.
+
+    Each entry stores (question vector, retrieved chunk ids, answer). A
+    lookup only hits when a stored question is within `threshold` cosine
+    similarity and was answered from the same set of chunks. The cache is
+    cleared whenever the index version it was filled against changes.
+    """
+
+    def __init__(self, threshold: float = 0.95, max_entries: int = 1000, candidates: int = 5):
+        self.threshold = threshold
+        self.max_entries = max(1, max_entries)
+        self.candidates = candidates
+        self.hits = 0
+        self.misses = 0
+        self._version = None
+        self._index = None
+        self._entries = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(vector: List[float]) -> np.ndarray:
+        array = np.asarray(vector, dtype=np.float32).reshape(1, -1)
+        norm = np.linalg.norm(array)
+        return array / norm if norm else array
+
+    def _check_version(self, version):
+        if version != self._version:
+            self._version = version
+            self._index = None
+            self._entries = []
+
+    def _rebuild(self, vectors: np.ndarray):
+        self._index = faiss.IndexFlatIP(vectors.shape[1])
+        self._index.add(vectors)
+
+    def lookup(self, vector: List[float], chunk_ids: List[str], version) -> Optional[str]:
+        """Return a cached answer for a similar question over the same chunks, if any."""
+        with self._lock:
+            self._check_version(version)
+
+            if self._index is not None and self._index.ntotal:
+                query = self._normalize(vector)
+                k = min(self.candidates, self._index.ntotal)
+                scores, positions = self._index.search(query, k)
+                wanted = frozenset(chunk_ids)
+
+                for score, position in zip(scores[0], positions[0]):
+                    if position < 0 or score < self.threshold:
+                        break
+                    entry_ids, answer = self._entries[position]
+                    if entry_ids == wanted:
+                        self.hits += 1
+                        return answer
+
+            self.misses += 1
+            return None
+
+    def add(self, vector: List[float], chunk_ids: List[str], answer: str, version):
+        """Store an answer generated for a question and its retrieved chunks."""
+        if not answer:
+            return
+
+        with self._lock:
+            self._check_version(version)
+            query = self._normalize(vector)
+
+            if self._index is None:
+                self._rebuild(query)
+            else:
+                if len(self._entries) >= self.max_entries:
+                    # Drop the oldest half and rebuild the (small) index
+                    keep = len(self._entries) // 2
+                    vectors = self._index.reconstruct_n(len(self._entries) - keep, keep)
+                    self._entries = self._entries[-keep:]
+                    self._rebuild(vectors)
+                self._index.add(query)
+
+            self._entries.append((frozenset(chunk_ids), answer))
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and the current number of entries."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
@@ -8,16 +8,29 @@ Supports multiple formats: PDF, DOCX, TXT, MD, and more!
 
 import os
 import sys
-import boto3
-from langchain_aws import ChatBedrock
+import time
+
+# Imported first so its clock starts with the app
+from startup import warm_up_imports, mark_stage, print_startup_report
+
 from dotenv import load_dotenv
 
+from quiz_parser import format_quiz
+
 from utils import (
     load_all_pdfs_from_directory, 
+    ingest_documents,
     build_qa_chain, 
     build_quiz_chain,
     build_quiz_chain_for_file,
-    get_available_files
+    get_available_files,
+    get_file_catalog,
+    describe_file,
+    get_cache_stats,
+    run_index_benchmark,
+    start_quiz_bank,
+    stop_quiz_bank,
+    take_bank_quiz
 )
 
 # Check for multi-format support
@@ -32,8 +45,111 @@ except ImportError:
 # Load environment variables from .env file
 load_dotenv()
 
+# Print answers and quizzes token by token as they are generated
+STREAM_OUTPUT = os.getenv("STUDY_BUDDY_STREAM", "1") != "0"
+
+# Print import and startup stage timings once the session is ready
+STARTUP_REPORT = os.getenv("STUDY_BUDDY_STARTUP_REPORT", "0") != "0"
+
+
+def format_sources(docs) -> str:
+    """Summarise retrieved chunks as 'file (p. 1, 3)' entries."""
+    pages = {}
+    for doc in docs:
+        name = doc.metadata.get("source_file") or os.path.basename(doc.metadata.get("source", "unknown"))
+        page = doc.metadata.get("page")
+        pages.setdefault(name, set())
+        if isinstance(page, int):
+            pages[name].add(page + 1)
+    
+    parts = []
+    for name, numbers in pages.items():
+        if numbers:
+            parts.append(f"{name} (p. {', '.join(str(n) for n in sorted(numbers))})")
+        else:
+            parts.append(name)
+    return "; ".join(parts)
+
+
+def print_timing(start: float, first_token: float = None):
+    """Print time-to-first-token and total latency for a response."""
+    total = time.perf_counter() - start
+    if first_token is not None:
+        print(f"⏱️  First token: {first_token - start:.2f}s | Total: {total:.2f}s\n")
+    else:
+        print(f"⏱️  Total: {total:.2f}s\n")
+
+
+def stream_answer(qa_chain, query: str):
+    """Stream a Q&A answer, then print the retrieved sources and timings."""
+    start = time.perf_counter()
+    first_token = None
+    context = []
+    cached = False
+    
+    if not STREAM_OUTPUT:
+        response = qa_chain.invoke({"input": query})
+        print("🤖 Assistant:\n")
+        print(response["answer"])
+        context = response.get("context", [])
+        cached = response.get("cached_answer", False)
+    else:
+        print("🤖 Assistant:\n")
+        for chunk in qa_chain.stream({"input": query}):
+            if "context" in chunk:
+                context = chunk["context"]
+            cached = cached or chunk.get("cached_answer", False)
+            token = chunk.get("answer")
+            if token:
+                if first_token is None:
+                    first_token = time.perf_counter()
+                print(token, end="", flush=True)
+        print()
+    
+    if cached:
+        print("\n💾 (cached answer to a similar earlier question)")
+    if context:
+        print(f"\n📎 Retrieved from: {format_sources(context)}")
+    print_timing(start, first_token)
+
+
+def stream_text(chain, chain_input):
+    """Stream a text chain (e.g. a quiz) to stdout, then print timings."""
+    start = time.perf_counter()
+    first_token = None
+    
+    if not STREAM_OUTPUT:
+        print(chain.invoke(chain_input))
+    else:
+        for token in chain.stream(chain_input):
+            if token and first_token is None:
+                first_token = time.perf_counter()
+            print(token, end="", flush=True)
+        print()
+    
+    print()
+    print_timing(start, first_token)
+
+
+def print_bank_quiz(vectorstore, num_questions: int, source_file: str = None) -> bool:
+    """Print a quiz from the pre-generated bank; False if the bank is exhausted."""
+    start = time.perf_counter()
+    questions = take_bank_quiz(vectorstore, num_questions, source_file)
+    if not questions:
+        return False
+    
+    print(format_quiz(questions))
+    print()
+    print(f"🏦 Served from the quiz bank in {time.perf_counter() - start:.2f}s\n")
+    return True
+
 
 def main():
+    mark_stage("Modules imported")
+    
+    # boto3, LangChain and FAISS load while the menu waits for input
+    warm_up_imports()
+    
     print("=" * 60)
     print("📚 Study Buddy - Your AI Learning Assistant")
     print("=" * 60)
@@ -47,8 +163,20 @@ def main():
         print("💡 Install optional packages for more formats (see MULTI_FORMAT_GUIDE.md)")
     print()
 
-    # 1. Setup AWS Bedrock client
+    # 1. Ask user for document location
+    print("📂 Document Source Options:")
+    print("   1. Use documents from 'files/' folder (default)")
+    print("   2. Specify custom path(s)")
+    print()
+    
+    mark_stage("Menu shown")
+    choice = input("Select option (1-2, press Enter for default): ").strip() or "1"
+    load_start = time.perf_counter()
+    
+    # 2. Setup AWS Bedrock client (after the menu, so boto3 has been
+    # loading in the background while the user chose)
     try:
+        import boto3
         bedrock_client = boto3.client(
             service_name="bedrock-runtime",
             region_name=os.getenv("AWS_DEFAULT_REGION", "us-east-1")
@@ -60,14 +188,6 @@ def main():
         print("   Option 2: Create a .env file with AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY")
         sys.exit(1)
 
-    # 2. Ask user for document location
-    print("📂 Document Source Options:")
-    print("   1. Use documents from 'files/' folder (default)")
-    print("   2. Specify custom path(s)")
-    print()
-    
-    choice = input("Select option (1-2, press Enter for default): ").strip() or "1"
-    
     vectorstore = None
     
     if choice == "1":
@@ -85,79 +205,29 @@ def main():
     
     elif choice == "2":
         # Custom path(s)
-        print("\n📄 Enter PDF path(s):")
+        print("\n📄 Enter document path(s):")
         print("   • For single file: /path/to/document.pdf")
         print("   • For directory: /path/to/folder/")
-        print("   • For multiple files: /path/file1.pdf,/path/file2.pdf (comma-separated)")
+        print("   • For several files/folders: /path/file1.pdf,/path/notes.md,/path/folder/ (comma-separated)")
         print()
         
-        paths = input("PDF path(s): ").strip()
+        paths = input("Document path(s): ").strip()
+        sources = [p.strip() for p in paths.split(",") if p.strip()]
         
-        if not paths:
+        if not sources:
             print("❌ No path provided. Exiting.")
             return
         
-        # Check if it's a directory
-        if os.path.isdir(paths):
-            print(f"\n📂 Loading all PDFs from directory: {paths}\n")
-            try:
-                vectorstore = load_all_pdfs_from_directory(paths, bedrock_client)
-            except Exception as e:
-                print(f"❌ Error processing directory: {e}")
-                return
-        
-        # Check if it's multiple comma-separated paths
-        elif "," in paths:
-            pdf_files = [p.strip() for p in paths.split(",")]
-            print(f"\n� Loading {len(pdf_files)} PDF file(s)...\n")
-            
-            all_docs = []
-            for pdf_path in pdf_files:
-                if not os.path.exists(pdf_path):
-                    print(f"⚠️  File not found: {pdf_path}")
-                    continue
-                
-                try:
-                    from langchain_community.document_loaders import PyPDFLoader
-                    loader = PyPDFLoader(pdf_path)
-                    docs = loader.load()
-                    for doc in docs:
-                        doc.metadata["source_file"] = os.path.basename(pdf_path)
-                    all_docs.extend(docs)
-                    print(f"   ✓ Loaded {os.path.basename(pdf_path)}: {len(docs)} pages")
-                except Exception as e:
-                    print(f"   ✗ Error loading {pdf_path}: {e}")
-            
-            if not all_docs:
-                print("❌ No documents loaded successfully")
-                return
-            
-            # Process all docs
-            print(f"\n✂️  Splitting text into chunks...")
-            from langchain_text_splitters import RecursiveCharacterTextSplitter
-            text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-            splits = text_splitter.split_documents(all_docs)
-            print(f"   ✓ Created {len(splits)} text chunks")
-            
-            print("🧠 Generating embeddings...")
-            from langchain_aws import BedrockEmbeddings
-            from langchain_community.vectorstores import FAISS
-            embeddings = BedrockEmbeddings(model_id="amazon.titan-embed-text-v1", client=bedrock_client)
-            vectorstore = FAISS.from_documents(splits, embeddings)
-            print("✅ All PDFs processed!\n")
-        
-        # Single file
+        # Files and folders all go through the same cached pipeline
+        if len(sources) == 1:
+            print(f"\n📂 Loading documents from: {sources[0]}\n")
         else:
-            if not os.path.exists(paths):
-                print(f"❌ File not found: {paths}")
-                return
-            
-            print(f"\n📄 Loading PDF: {os.path.basename(paths)}\n")
-            try:
-                vectorstore = load_and_process_pdf(paths, bedrock_client)
-            except Exception as e:
-                print(f"❌ Error processing PDF: {e}")
-                return
+            print(f"\n📂 Loading documents from {len(sources)} locations...\n")
+        try:
+            vectorstore = ingest_documents(sources, bedrock_client)
+        except Exception as e:
+            print(f"❌ Error processing documents: {e}")
+            return
     
     else:
         print("❌ Invalid option. Exiting.")
@@ -167,7 +237,12 @@ def main():
         print("❌ Failed to create knowledge base")
         return
 
+    mark_stage("Knowledge base loaded", load_start)
+    
     # 3. Setup LLM
+    from langchain_aws import ChatBedrock
+    
+    setup_start = time.perf_counter()
     llm = ChatBedrock(
         model_id="amazon.nova-lite-v1:0",
         client=bedrock_client,
@@ -177,6 +252,15 @@ def main():
     # 4. Build chains
     qa_chain = build_qa_chain(llm, vectorstore)
     quiz_chain = build_quiz_chain(llm, vectorstore)
+    
+    # Pre-generate quiz questions in the background
+    quiz_bank = start_quiz_bank(llm, vectorstore)
+    if quiz_bank is not None:
+        print(f"🏦 Quiz bank: {quiz_bank.stats()['stored']} question(s) ready, filling in the background\n")
+    
+    mark_stage("LLM and chains set up", setup_start)
+    if STARTUP_REPORT:
+        print_startup_report()
 
     # 5. Interactive chat loop
     print("💬 Study session started!")
@@ -186,6 +270,8 @@ def main():
     print("  • Type 'quiz file' to interactively select a file for quiz")
     print("  • Type 'quiz file <filename>' to quiz from specific file directly")
     print("  • Type 'files' to see available files")
+    print("  • Type 'stats' to see cache statistics")
+    print("  • Type 'benchmark' to compare search index types on your documents")
     print("  • Type 'exit' or 'quit' to end the session")
     print("-" * 60)
     print()
@@ -204,16 +290,38 @@ def main():
 
             # Show available files
             if query.lower() == "files":
+                catalog = get_file_catalog(vectorstore)
                 available_files = get_available_files(vectorstore)
                 if available_files:
                     print(f"\n📚 Available files ({len(available_files)}):")
                     for i, file in enumerate(available_files, 1):
-                        print(f"   {i}. {file}")
+                        print(f"   {i}. {file} ({describe_file(catalog[file])})")
                     print()
                 else:
                     print("\n⚠️  Could not retrieve file list\n")
                 continue
 
+            # Show cache statistics
+            if query.lower() == "stats":
+                cache_stats = get_cache_stats()
+                if cache_stats:
+                    print("\n📈 Cache statistics:")
+                    for name, counters in cache_stats.items():
+                        details = ", ".join(f"{key}: {value}" for key, value in counters.items())
+                        print(f"   • {name}: {details}")
+                    print()
+                else:
+                    print("\n⚠️  No cache statistics yet\n")
+                continue
+
+            # Compare FAISS index types on the loaded vectors
+            if query.lower() == "benchmark":
+                try:
+                    run_index_benchmark(vectorstore)
+                except Exception as e:
+                    print(f"❌ Benchmark failed: {e}\n")
+                continue
+
             # Quiz generation from specific file (with filename or interactive)
             if query.lower().startswith("quiz file"):
                 available_files = get_available_files(vectorstore)
@@ -280,11 +388,10 @@ def main():
                 print(f"\n🤖 Generating {num_questions} questions from '{selected_file}'...\n")
                 
                 try:
-                    file_quiz_chain = build_quiz_chain_for_file(llm, vectorstore, selected_file, num_questions)
-                    result = file_quiz_chain.invoke(str(num_questions))
                     print(f"📝 Quiz from: {selected_file}\n")
-                    print(result)
-                    print()
+                    if not print_bank_quiz(vectorstore, num_questions, selected_file):
+                        file_quiz_chain = build_quiz_chain_for_file(llm, vectorstore, selected_file, num_questions)
+                        stream_text(file_quiz_chain, str(num_questions))
                 except Exception as e:
                     print(f"❌ Error generating quiz: {e}\n")
                 
@@ -301,9 +408,8 @@ def main():
                 print(f"\n🤖 Generating {num_questions} practice questions (from all files)...\n")
 
                 try:
-                    result = quiz_chain.invoke(str(num_questions))
-                    print(result)
-                    print()
+                    if not print_bank_quiz(vectorstore, num_questions):
+                        stream_text(quiz_chain, str(num_questions))
                 except Exception as e:
                     print(f"❌ Error generating quiz: {e}\n")
 
@@ -313,10 +419,7 @@ def main():
             print("🤔 Thinking...\n")
 
             try:
-                response = qa_chain.invoke({"input": query})
-                print("🤖 Assistant:\n")
-                print(response["answer"])
-                print()
+                stream_answer(qa_chain, query)
             except Exception as e:
                 print(f"❌ Error: {e}\n")
 
@@ -325,6 +428,8 @@ def main():
             break
         except Exception as e:
             print(f"\n❌ Unexpected error: {e}\n")
+    
+    stop_quiz_bank()
 
 
 if __name__ == "__main__":
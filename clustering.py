@@ -0,0 +1,127 @@
+"""
+Chunk Clustering
+NumPy k-means over the vectors already stored in the FAISS index, used to
+pick quiz context that covers all topics of a file instead of the few chunks
+closest to one fixed query. No embedding calls are made.
+"""
+
+from typing import List
+
+import numpy as np
+
+CLUSTER_SAMPLE_SIZE = 10000   # Vectors used to fit the centroids
+CLUSTER_BATCH_SIZE = 10000    # Vectors reconstructed at a time when assigning
+
+
+def _squared_distances(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    # |v - c|^2 = |v|^2 - 2 v.c + |c|^2, without materialising v - c
+    distances = (vectors ** 2).sum(axis=1)[:, None] - 2 * vectors @ centroids.T + (centroids ** 2).sum(axis=1)[None, :]
+    return np.maximum(distances, 0)
+
+
+def kmeans(vectors: np.ndarray, num_clusters: int, iterations: int = 20, seed: int = 0) -> np.ndarray:
+    """
+    Fit k-means centroids (k-means++ initialisation, Lloyd iterations).
+
+    Args:
+        vectors: (n, d) float32 array
+        num_clusters: Number of centroids, capped at n
+        iterations: Maximum Lloyd iterations
+        seed: Random seed, so the same vectors always give the same clusters
+
+    Returns:
+        (k, d) array of centroids
+    """
+    rng = np.random.default_rng(seed)
+    n = len(vectors)
+    k = max(1, min(num_clusters, n))
+
+    # k-means++: spread the initial centroids out
+    centroids = np.empty((k, vectors.shape[1]), dtype=np.float32)
+    centroids[0] = vectors[rng.integers(n)]
+    closest = _squared_distances(vectors, centroids[:1])[:, 0].astype(np.float64)
+    for i in range(1, k):
+        total = closest.sum()
+        index = rng.choice(n, p=closest / total) if total > 0 else rng.integers(n)
+        centroids[i] = vectors[index]
+        closest = np.minimum(closest, _squared_distances(vectors, centroids[i:i + 1])[:, 0])
+
+    for _ in range(iterations):
+        distances = _squared_distances(vectors, centroids)
+        labels = distances.argmin(axis=1)
+
+        updated = centroids.copy()
+        for i in range(k):
+            members = vectors[labels == i]
+            if len(members):
+                updated[i] = members.mean(axis=0)
+            else:
+                # Re-seed an empty cluster with the worst-fitting vector
+                updated[i] = vectors[distances.min(axis=1).argmax()]
+
+        if np.allclose(updated, centroids):
+            break
+        centroids = updated
+
+    return centroids
+
+
+def cluster_positions(index, positions: np.ndarray, num_clusters: int, seed: int = 0) -> List[np.ndarray]:
+    """
+    Group FAISS index rows into clusters of similar chunks.
+
+    Centroids are fitted on a sample of at most CLUSTER_SAMPLE_SIZE vectors;
+    every row is then assigned in batches, so memory stays bounded for
+    large indexes.
+
+    Returns:
+        One array of positions per cluster, ordered from the chunk nearest the
+        centroid (the most representative) outwards. Clusters are ordered by
+        their earliest position, which roughly follows document order.
+    """
+    positions = np.asarray(positions, dtype=np.int64)
+    if len(positions) == 0:
+        return []
+
+    rng = np.random.default_rng(seed)
+    sample = positions
+    if len(positions) > CLUSTER_SAMPLE_SIZE:
+        sample = np.sort(rng.choice(positions, CLUSTER_SAMPLE_SIZE, replace=False))
+    centroids = kmeans(index.reconstruct_batch(sample).astype(np.float32), num_clusters, seed=seed)
+
+    labels = np.empty(len(positions), dtype=np.int64)
+    distances = np.empty(len(positions), dtype=np.float32)
+    for start in range(0, len(positions), CLUSTER_BATCH_SIZE):
+        batch = positions[start:start + CLUSTER_BATCH_SIZE]
+        batch_distances = _squared_distances(index.reconstruct_batch(batch).astype(np.float32), centroids)
+        labels[start:start + len(batch)] = batch_distances.argmin(axis=1)
+        distances[start:start + len(batch)] = batch_distances.min(axis=1)
+
+    clusters = []
+    for i in range(len(centroids)):
+        members = np.flatnonzero(labels == i)
+        if len(members):
+            clusters.append(positions[members[np.argsort(distances[members], kind="stable")]])
+
+    clusters.sort(key=lambda members: members.min())
+    return clusters
+
+
+def rotate_representatives(clusters: List[np.ndarray], start: int, count: int) -> List[int]:
+    """
+    Pick `count` positions by walking the clusters round-robin from slot `start`.
+
+    Slot s takes the (s // len(clusters))-th most representative chunk of
+    cluster s % len(clusters), so consecutive calls with an advancing start
+    cover every cluster before any cluster repeats.
+    """
+    if not clusters:
+        return []
+
+    picked = []
+    for slot in range(start, start + count):
+        members = clusters[slot % len(clusters)]
+        position = int(members[(slot // len(clusters)) % len(members)])
+        if position not in picked:
+            picked.append(position)
+    return picked
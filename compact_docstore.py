@@ -0,0 +1,207 @@
+"""
+Compact Docstore
+LangChain docstore that keeps chunk text in one contiguous UTF-8 blob with
+an offsets array and stores metadata as columns, instead of one Document
+object per chunk. Saved stores are memory-mapped, so chunk text stays on
+disk until a chunk is actually retrieved.
+"""
+
+import os
+import json
+from array import array
+from typing import List, Dict, Optional, Union
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_community.docstore.base import AddableMixin, Docstore
+
+from index_store import replacing, encode_strings, decode_strings
+
+CHUNK_TEXT_FILE = "chunks.txt"    # Concatenated UTF-8 chunk texts
+CHUNK_TABLE_FILE = "chunks.npz"   # Ids, offsets and metadata columns
+CHUNK_TABLE_VERSION = 2
+INT_COLUMNS = ("page", "section", "start_index")  # Per-chunk integer metadata
+
+
+def _to_array(typecode: str, values: np.ndarray) -> array:
+    converted = array(typecode)
+    converted.frombytes(np.ascontiguousarray(values, dtype=np.dtype(typecode)).tobytes())
+    return converted
+
+
+def _record_key(record: dict) -> str:
+    return json.dumps(record, sort_keys=True, default=str)
+
+
+class CompactDocstore(Docstore, AddableMixin):
+    """
+    Docstore with columnar storage, keyed by chunk id.
+
+    Text is one UTF-8 blob (the memory-mapped CHUNK_TEXT_FILE plus a bytes
+    tail for chunks added since loading) sliced by an int64 offsets array.
+    Integer metadata (INT_COLUMNS) is stored in its own columns, -1 meaning
+    absent. The remaining metadata (source_file, file_type, source, ...) is
+    the same for every chunk of a file, so each distinct record is stored
+    once and chunks keep its number. Documents are only built by search().
+    Deleted chunks keep their row until the next save(). With mmap=False,
+    saved text is read into memory instead of being mapped.
+    """
+
+    def __init__(self, mmap: bool = True):
+        self.mmap = mmap
+        self.ids = []
+        self._rows = {}
+        self._text = b""
+        self._tail = bytearray()
+        self._offsets = array("q", [0])
+        self._columns = {name: array("q") for name in INT_COLUMNS}
+        self._record_ids = array("i")
+        self._records = []
+        self._record_lookup = {}
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _intern(self, record: dict) -> int:
+        key = _record_key(record)
+        number = self._record_lookup.get(key)
+        if number is None:
+            number = self._record_lookup[key] = len(self._records)
+            self._records.append(json.loads(key))
+        return number
+
+    def add(self, texts: Dict[str, Document]) -> None:
+        """Add documents by id."""
+        overlapping = set(texts).intersection(self._rows)
+        if overlapping:
+            raise ValueError(f"Tried to add ids that already exist: {overlapping}")
+
+        for chunk_id, doc in texts.items():
+            self._rows[chunk_id] = len(self.ids)
+            self.ids.append(chunk_id)
+            self._tail += doc.page_content.encode("utf-8")
+            self._offsets.append(len(self._text) + len(self._tail))
+
+            record = dict(doc.metadata)
+            for name in INT_COLUMNS:
+                value = record.get(name)
+                if isinstance(value, int) and not isinstance(value, bool) and value >= 0:
+                    del record[name]
+                    self._columns[name].append(value)
+                else:
+                    self._columns[name].append(-1)
+            self._record_ids.append(self._intern(record))
+
+    def delete(self, ids: List) -> None:
+        """Remove documents by id."""
+        overlapping = set(ids).intersection(self._rows)
+        if not overlapping:
+            raise ValueError(f"Tried to delete ids that does not exist: {ids}")
+        for chunk_id in overlapping:
+            del self._rows[chunk_id]
+
+    def _text_bytes(self, row: int) -> bytes:
+        start, end = self._offsets[row], self._offsets[row + 1]
+        frozen = len(self._text)
+        if start >= frozen:
+            return bytes(self._tail[start - frozen:end - frozen])
+        return bytes(self._text[start:end])
+
+    def search(self, search: str) -> Union[str, Document]:
+        """Return the Document for an id, or an error message if it is not stored."""
+        row = self._rows.get(search)
+        if row is None:
+            return f"ID {search} not found."
+
+        metadata = dict(self._records[self._record_ids[row]])
+        for name in INT_COLUMNS:
+            value = self._columns[name][row]
+            if value >= 0:
+                metadata[name] = value
+        return Document(id=search, page_content=self._text_bytes(row).decode("utf-8"), metadata=metadata)
+
+    def save(self, cache_dir: str, ids: Optional[List[str]] = None):
+        """
+        Write the store to a cache folder and switch to the written text.
+
+        Rows are written in the order of `ids` (e.g. FAISS index positions,
+        so the order can be rebuilt on load), default insertion order.
+        Deleted rows are dropped.
+        """
+        ids = list(self._rows) if ids is None else ids
+        rows = [self._rows[chunk_id] for chunk_id in ids]
+
+        # Records no longer used by any row are dropped
+        used = sorted({self._record_ids[row] for row in rows})
+        renumber = {number: i for i, number in enumerate(used)}
+
+        text_path = os.path.join(cache_dir, CHUNK_TEXT_FILE)
+        table_path = os.path.join(cache_dir, CHUNK_TABLE_FILE)
+        with replacing(text_path) as text_tmp, replacing(table_path) as table_tmp:
+            offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+            with open(text_tmp, 'wb') as f:
+                for i, row in enumerate(rows):
+                    data = self._text_bytes(row)
+                    f.write(data)
+                    offsets[i + 1] = offsets[i] + len(data)
+
+            with open(table_tmp, 'wb') as f:
+                np.savez(
+                    f,
+                    version=np.array([CHUNK_TABLE_VERSION]),
+                    ids=encode_strings(ids),
+                    offsets=offsets,
+                    records=encode_strings([_record_key(self._records[number]) for number in used]),
+                    record_ids=np.array([renumber[self._record_ids[row]] for row in rows], dtype=np.int32),
+                    **{name: np.array([self._columns[name][row] for row in rows], dtype=np.int64) for name in INT_COLUMNS},
+                )
+
+        self._read(cache_dir)
+
+    @classmethod
+    def load(cls, cache_dir: str, mmap: bool = True) -> "CompactDocstore":
+        """Load a store written by save(); raises OSError/ValueError if missing or outdated."""
+        store = cls(mmap)
+        store._read(cache_dir)
+        return store
+
+    def _read(self, cache_dir: str):
+        with np.load(os.path.join(cache_dir, CHUNK_TABLE_FILE), allow_pickle=False) as data:
+            if int(data["version"][0]) != CHUNK_TABLE_VERSION:
+                raise ValueError("Unsupported chunk table version")
+            ids = decode_strings(data["ids"])
+            offsets = _to_array("q", data["offsets"])
+            record_ids = _to_array("i", data["record_ids"])
+            columns = {name: _to_array("q", data[name]) for name in INT_COLUMNS}
+            keys = decode_strings(data["records"])
+
+        text_path = os.path.join(cache_dir, CHUNK_TEXT_FILE)
+        size = os.path.getsize(text_path)
+        if size != offsets[-1]:
+            raise ValueError("Chunk text file does not match its table")
+
+        self.ids = ids
+        self._rows = {chunk_id: row for row, chunk_id in enumerate(ids)}
+        if not size:
+            self._text = b""  # np.memmap cannot map an empty file
+        elif self.mmap:
+            self._text = np.memmap(text_path, dtype=np.uint8, mode="r")
+        else:
+            self._text = np.fromfile(text_path, dtype=np.uint8)
+        self._tail = bytearray()
+        self._offsets = offsets
+        self._columns = columns
+        self._record_ids = record_ids
+        self._records = [json.loads(key) for key in keys]
+        self._record_lookup = {key: i for i, key in enumerate(keys)}
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore) -> "CompactDocstore":
+        """Copy every chunk of a FAISS vectorstore's docstore, in index order."""
+        store = cls()
+        for position in sorted(vectorstore.index_to_docstore_id):
+            chunk_id = vectorstore.index_to_docstore_id[position]
+            doc = vectorstore.docstore.search(chunk_id)
+            if isinstance(doc, Document):
+                store.add({chunk_id: doc})
+        return store
@@ -0,0 +1,138 @@
+"""
+Context Packer
+Merges overlapping or adjacent retrieved chunks from the same source and page
+and trims the result to a token budget before it is stuffed into the prompt,
+keeping a citation label on every packed section.
+"""
+
+import os
+from typing import List, Optional
+
+from langchain_core.documents import Document
+
+CHARS_PER_TOKEN = 4      # Rough estimate for English text
+MIN_TEXT_OVERLAP = 20    # Shortest repeated text treated as chunk overlap
+MAX_TEXT_OVERLAP = 1000  # Longest overlap checked when chunks have no start_index
+GAP_MARKER = "\n[...]\n"
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens in a text."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def citation_label(metadata: dict) -> str:
+    """Return a 'file, page N' label for a chunk's metadata."""
+    name = metadata.get("source_file") or os.path.basename(str(metadata.get("source", "unknown")))
+    page = metadata.get("page")
+    if isinstance(page, int):
+        return f"{name}, page {page + 1}"
+    return name
+
+
+def _text_overlap(first: str, second: str) -> int:
+    """Length of the longest suffix of `first` that is a prefix of `second`."""
+    for size in range(min(len(first), len(second), MAX_TEXT_OVERLAP), MIN_TEXT_OVERLAP - 1, -1):
+        if first.endswith(second[:size]):
+            return size
+    return 0
+
+
+def _parent_key(metadata: dict) -> tuple:
+    """Key shared by the chunks of one loaded document (a page, a CSV row, ...)."""
+    source = metadata.get("source_file") or metadata.get("source")
+    return source, metadata.get("page"), metadata.get("section", metadata.get("row"))
+
+
+def _merge_by_offset(chunks: List[Document]) -> List[str]:
+    # Chunks of one parent document split with add_start_index: merge
+    # exactly by character offsets
+    chunks = sorted(chunks, key=lambda doc: doc.metadata["start_index"])
+    segments = []
+    end = None
+    for doc in chunks:
+        start = doc.metadata["start_index"]
+        text = doc.page_content
+        if end is not None and start <= end:
+            if start + len(text) > end:
+                segments[-1] += text[end - start:]
+                end = start + len(text)
+        else:
+            segments.append(text)
+            end = start + len(text)
+    return segments
+
+
+def _merge_by_text(chunks: List[Document]) -> List[str]:
+    # Older chunks without offsets: detect the repeated overlap text instead
+    segments = []
+    for doc in chunks:
+        text = doc.page_content
+        for i, segment in enumerate(segments):
+            if text in segment:
+                break
+            if segment in text:
+                segments[i] = text
+                break
+            overlap = _text_overlap(segment, text)
+            if overlap:
+                segments[i] = segment + text[overlap:]
+                break
+            overlap = _text_overlap(text, segment)
+            if overlap:
+                segments[i] = text + segment[overlap:]
+                break
+        else:
+            segments.append(text)
+    return segments
+
+
+def _truncate(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    cut = text.rfind(" ", 0, max_chars)
+    return text[:cut if cut > max_chars // 2 else max_chars].rstrip() + " ..."
+
+
+def pack_documents(docs: List[Document], max_tokens: Optional[int] = None, min_tokens: int = 50) -> List[Document]:
+    """
+    Pack retrieved chunks into as few, non-repeating sections as possible.
+
+    Chunks from the same parent document (source, page and section or row)
+    are merged: overlapping or adjacent text is joined once, separate
+    passages are joined with a gap marker. Offsets are only compared within
+    a known parent; otherwise the overlapping text itself is matched.
+    Sections keep the retrieval order of their best-ranked chunk and the
+    first chunk's metadata, plus 'citation' and 'chunk_ids' keys. With
+    max_tokens, sections are added until the budget is spent; the last one
+    is truncated if at least `min_tokens` of budget remain.
+    """
+    groups = {}
+    for doc in docs:
+        groups.setdefault(_parent_key(doc.metadata), []).append(doc)
+
+    packed = []
+    remaining = max_tokens
+    for (_, page, section), chunks in groups.items():
+        # Without a page or section, chunks may come from several documents
+        # of the file (each starting at offset 0)
+        known_parent = page is not None or section is not None
+        if known_parent and all("start_index" in doc.metadata for doc in chunks):
+            segments = _merge_by_offset(chunks)
+        else:
+            segments = _merge_by_text(chunks)
+        text = GAP_MARKER.join(segments)
+
+        if remaining is not None:
+            if remaining < min_tokens and packed:
+                break
+            if estimate_tokens(text) > remaining:
+                text = _truncate(text, max(remaining, min_tokens) * CHARS_PER_TOKEN)
+            remaining -= estimate_tokens(text)
+
+        metadata = dict(chunks[0].metadata)
+        metadata["citation"] = citation_label(metadata)
+        metadata["chunk_ids"] = [doc.id for doc in chunks if doc.id]
+        packed.append(Document(page_content=text, metadata=metadata, id=chunks[0].id))
+
+    return packed
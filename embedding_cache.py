@@ -0,0 +1,174 @@
+"""
+Embedding Cache
+SQLite-backed cache of chunk embeddings keyed by (model id, chunk text hash),
+so identical text is only ever sent to Bedrock once, plus an in-memory LRU
+for repeated query embeddings.
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from array import array
+from collections import OrderedDict
+from typing import List, Dict, Optional
+
+from langchain_core.embeddings import Embeddings
+
+# SQLite limits the number of bound parameters per statement
+_LOOKUP_BATCH = 500
+
+
+def text_hash(text: str) -> str:
+    """Return the cache key hash for a chunk of text."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that consults a local SQLite cache before calling
+    the underlying model for document embeddings.
+
+    Query embeddings are passed straight through.
+    """
+
+    def __init__(self, embeddings: Embeddings, model_id: str, db_path: str):
+        self.embeddings = embeddings
+        self.model_id = model_id
+        self.db_path = db_path
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model_id TEXT NOT NULL,"
+            " text_hash TEXT NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " PRIMARY KEY (model_id, text_hash)"
+            ") WITHOUT ROWID"
+        )
+        self._conn.commit()
+
+    def _lookup(self, hashes: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        with self._lock:
+            for start in range(0, len(hashes), _LOOKUP_BATCH):
+                batch = hashes[start:start + _LOOKUP_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings "
+                    f"WHERE model_id = ? AND text_hash IN ({placeholders})",
+                    [self.model_id, *batch],
+                )
+                for key, blob in rows:
+                    vector = array('f')
+                    vector.frombytes(blob)
+                    found[key] = vector.tolist()
+        return found
+
+    def _store(self, items: Dict[str, List[float]]):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model_id, text_hash, vector) VALUES (?, ?, ?)",
+                [(self.model_id, key, array('f', vector).tobytes()) for key, vector in items.items()],
+            )
+            self._conn.commit()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents, only calling the model for text not seen before."""
+        hashes = [text_hash(text) for text in texts]
+        cached = self._lookup(sorted(set(hashes)))
+
+        # Embed each distinct missing text once
+        missing = {}
+        for key, text in zip(hashes, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            new_items = dict(zip(missing.keys(), vectors))
+            self._store(new_items)
+            cached.update(new_items)
+
+        self.misses += len(missing)
+        self.hits += len(texts) - len(missing)
+
+        return [cached[key] for key in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query with the underlying model."""
+        return self.embeddings.embed_query(text)
+
+    def reset_stats(self):
+        """Reset the hit/miss counters."""
+        self.hits = 0
+        self.misses = 0
+
+
+def normalize_query(text: str) -> str:
+    """Normalise a query for cache lookups (case and whitespace insensitive)."""
+    return " ".join(text.lower().split())
+
+
+class QueryCacheEmbeddings(Embeddings):
+    """
+    Embeddings wrapper with a bounded, time-limited LRU cache for queries.
+
+    Repeated questions (after case/whitespace normalisation) reuse the
+    stored query vector instead of calling the model again. Document
+    embeddings are passed straight through.
+    """
+
+    def __init__(self, embeddings: Embeddings, max_size: int = 256, ttl: float = 3600):
+        self.embeddings = embeddings
+        self.max_size = max(1, max_size)
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents with the underlying model."""
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query, reusing a cached vector when available and fresh."""
+        key = normalize_query(text)
+        now = time.monotonic()
+
+        with self._lock:
+            item = self._cache.get(key)
+            if item is not None and (not self.ttl or now - item[0] < self.ttl):
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return item[1]
+            self.misses += 1
+
+        vector = self.embeddings.embed_query(text)
+
+        with self._lock:
+            self._cache[key] = (now, vector)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+
+        return vector
+
+    def get_cached(self, text: str) -> Optional[List[float]]:
+        """Return the cached vector for a query without counting a lookup, or None."""
+        with self._lock:
+            item = self._cache.get(normalize_query(text))
+            if item is not None and (not self.ttl or time.monotonic() - item[0] < self.ttl):
+                return item[1]
+        return None
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and the current cache size."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._cache)}
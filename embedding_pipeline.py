@@ -0,0 +1,184 @@
+"""
+Concurrent Embedding Pipeline
+Fans chunk batches out over a bounded thread pool and adapts the number of
+in-flight Bedrock requests to throttling feedback (AIMD: additive increase,
+multiplicative decrease).
+"""
+
+import time
+import queue
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Iterable, Iterator
+
+from langchain_core.embeddings import Embeddings
+
+# Bedrock/botocore error codes that mean "slow down" rather than "failed"
+THROTTLING_ERROR_CODES = {
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "ServiceUnavailableException",
+    "ModelNotReadyException",
+}
+
+
+def is_throttling_error(error: Exception) -> bool:
+    """Check whether an exception raised by the Bedrock client is a throttle."""
+    response = getattr(error, "response", None)
+    if isinstance(response, dict):
+        code = response.get("Error", {}).get("Code")
+        if code in THROTTLING_ERROR_CODES:
+            return True
+    return type(error).__name__ in THROTTLING_ERROR_CODES
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD concurrency limiter.
+
+    The limit grows by roughly one slot per round of successful requests and
+    is halved whenever a request is throttled.
+    """
+
+    def __init__(self, max_limit: int, initial_limit: int = None, min_limit: int = 1):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = float(initial_limit or self.max_limit)
+        self.limit = min(max(self.limit, self.min_limit), self.max_limit)
+        self.in_flight = 0
+        self.throttle_count = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """Block until a request slot is free under the current limit."""
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+
+    def release(self, throttled: bool = False):
+        """Free a slot and adjust the limit based on the request outcome."""
+        with self._cond:
+            self.in_flight -= 1
+            if throttled:
+                self.throttle_count += 1
+                self.limit = max(self.min_limit, self.limit / 2)
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+
+class ConcurrentEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that embeds document batches concurrently.
+
+    Each batch is retried with exponential backoff when throttled, and the
+    shared AdaptiveConcurrency limiter keeps the request rate under what the
+    endpoint accepts. Any object implementing Embeddings can be wrapped,
+    which also makes the pipeline easy to exercise against a fake client.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        max_workers: int = 8,
+        batch_size: int = 16,
+        max_retries: int = 8,
+        base_delay: float = 0.5,
+        max_delay: float = 20.0,
+    ):
+        self.embeddings = embeddings
+        self.max_workers = max(1, max_workers)
+        self.batch_size = max(1, batch_size)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.limiter = AdaptiveConcurrency(self.max_workers)
+
+    def _embed_one(self, text: str) -> List[float]:
+        attempt = 0
+        while True:
+            self.limiter.acquire()
+            try:
+                vector = self.embeddings.embed_documents([text])[0]
+            except Exception as e:
+                throttled = is_throttling_error(e)
+                self.limiter.release(throttled=throttled)
+                if not throttled or attempt >= self.max_retries:
+                    raise
+                delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+                time.sleep(delay * random.uniform(0.5, 1.0))
+                attempt += 1
+                continue
+            self.limiter.release()
+            return vector
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        # Titan takes one text per request, so each text is its own
+        # rate-limited request and a throttle only retries that text
+        return [self._embed_one(text) for text in texts]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents in concurrent batches, preserving input order."""
+        if not texts:
+            return []
+
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+
+        if len(batches) == 1:
+            return self._embed_batch(batches[0])
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as executor:
+            results = list(executor.map(self._embed_batch, batches))
+
+        return [vector for batch in results for vector in batch]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query with the underlying model."""
+        return self.embeddings.embed_query(text)
+
+
+_END = object()
+
+
+def prefetch(iterable: Iterable, maxsize: int = 2) -> Iterator:
+    """
+    Run an iterable in a background thread, buffering up to `maxsize` items.
+
+    Chaining stages through prefetch lets them overlap (e.g. parsing the next
+    file while the current chunks are embedded) while the bounded queue keeps
+    a fast producer from running ahead of a slow consumer. Exceptions raised
+    by the producer are re-raised in the consumer.
+    """
+    items = queue.Queue(maxsize=max(1, maxsize))
+    stop = threading.Event()
+
+    def produce():
+        try:
+            for item in iterable:
+                while not stop.is_set():
+                    try:
+                        items.put(item, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+                if stop.is_set():
+                    return
+            items.put(_END)
+        except BaseException as e:
+            items.put(e)
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+
+    try:
+        while True:
+            item = items.get()
+            if item is _END:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
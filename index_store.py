@@ -0,0 +1,632 @@
+"""
+Persistent Index Store
+Saves the FAISS index, the compact docstore and a per-file manifest to disk so
+an unchanged document folder is reloaded on startup instead of being
+re-embedded.
+"""
+
+from __future__ import annotations
+
+import os
+import json
+import math
+import time
+import hashlib
+import tempfile
+from contextlib import contextmanager
+from typing import List, Optional, Dict, TYPE_CHECKING
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+# Cache locking between sessions (not available on Windows)
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Only needed once an index is saved or loaded; see utils
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+    from langchain_community.vectorstores import FAISS
+
+MANIFEST_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+INDEX_NAME = "index"
+LOCK_FILE = ".lock"
+
+# Index type selection by corpus size (see choose_index_factory)
+FLAT_INDEX_MAX = 20000     # Exact search below this many vectors
+HNSW_INDEX_MAX = 200000    # Graph search below this, IVF-PQ above
+HNSW_EF_SEARCH = 64        # HNSW search breadth (recall vs latency)
+IVF_NPROBE = 32            # IVF lists scanned per query
+TRAIN_POINTS_PER_LIST = 64 # IVF training sample size per list
+
+# Vector storage precision for Flat / HNSW indexes
+PRECISION_CODECS = {"float32": "", "float16": "SQfp16", "int8": "SQ8"}
+VECTORS_FILE = "vectors.f32"  # Full-precision vectors for re-ranking compressed indexes
+RERANK_FACTOR = 4             # Candidates fetched per result before exact re-ranking
+
+
+@contextmanager
+def replacing(path: str):
+    """
+    Yield a new temporary path next to `path`, moved over `path` when the block succeeds.
+
+    Each writer gets its own temporary file, so sessions saving the same
+    cache at once never write into each other's files; readers only ever
+    see complete files.
+    """
+    directory, name = os.path.split(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=name + ".", suffix=".tmp")
+    os.close(fd)
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+@contextmanager
+def cache_lock(cache_dir: str):
+    """
+    Hold an exclusive lock on a cache folder.
+
+    Sessions sharing a cache load, update and save it one at a time, so an
+    index, docstore and manifest saved together always belong together.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    if fcntl is None:
+        yield
+        return
+
+    with open(os.path.join(cache_dir, LOCK_FILE), 'a') as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            print("⏳ Waiting for another session to finish updating the index cache...")
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def encode_strings(values: List[str]) -> np.ndarray:
+    """Pack strings into a uint8 array (UTF-8 JSON) for np.savez."""
+    # np str arrays pad every entry to the longest one
+    return np.frombuffer(json.dumps(values).encode("utf-8"), dtype=np.uint8)
+
+
+def decode_strings(data: np.ndarray) -> List[str]:
+    """Unpack strings stored with encode_strings()."""
+    return json.loads(data.tobytes().decode("utf-8"))
+
+
+def hash_file(file_path: str, block_size: int = 1 << 20) -> str:
+    """Return the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def get_cache_dir(cache_root: str, source) -> str:
+    """
+    Return the cache folder used for a document source.
+
+    The source is a path (directory or file) or a list of paths; a single
+    path gets the same folder whether or not it is wrapped in a list.
+    """
+    sources = [source] if isinstance(source, str) else list(source)
+    source_paths = sorted({os.path.abspath(path) for path in sources})
+    source_key = hashlib.sha1("\n".join(source_paths).encode('utf-8')).hexdigest()[:12]
+    name = Path(source_paths[0]).name or "root"
+    if len(source_paths) > 1:
+        name += f"+{len(source_paths) - 1}"
+    return os.path.join(cache_root, f"{name}-{source_key}")
+
+
+def fingerprint_files(file_paths: List[str], previous: Optional[Dict[str, dict]] = None) -> Dict[str, dict]:
+    """
+    Build manifest entries (path, size, mtime, content hash) for the given files.
+
+    Args:
+        file_paths: Files to fingerprint
+        previous: Entries from the last manifest; their hash is reused when
+            size and mtime are unchanged so unchanged files are not re-read
+
+    Returns:
+        Dictionary of file name -> manifest entry
+    """
+    previous = previous or {}
+    entries = {}
+
+    for file_path in file_paths:
+        path = os.path.abspath(str(file_path))
+        stat = os.stat(path)
+        name = Path(path).name
+        old = previous.get(name)
+
+        if old and old.get("path") == path and old.get("size") == stat.st_size and old.get("mtime") == stat.st_mtime_ns:
+            content_hash = old["sha256"]
+        else:
+            content_hash = hash_file(path)
+
+        entries[name] = {
+            "path": path,
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+            "sha256": content_hash,
+            "chunk_ids": [],
+        }
+
+    return entries
+
+
+def new_manifest(settings: dict, files: Dict[str, dict], index_factory: str = "Flat",
+                 requested_factory: Optional[str] = None, trained_size: Optional[int] = None) -> dict:
+    """
+    Create a manifest for an index built with the given settings.
+
+    `requested_factory` is the index type that was asked for, when it could
+    not be built and `index_factory` is the fallback that was used instead.
+    `trained_size` is the number of vectors the index was built (trained) on.
+    """
+    return {
+        "version": MANIFEST_VERSION,
+        "settings": settings,
+        "index_factory": index_factory,
+        "requested_factory": requested_factory or index_factory,
+        "trained_size": trained_size,
+        "files": files,
+    }
+
+
+def manifest_is_compatible(manifest: dict, settings: dict) -> bool:
+    """Check whether a stored manifest was built with the current settings."""
+    return manifest.get("version") == MANIFEST_VERSION and manifest.get("settings") == settings
+
+
+def diff_manifest(manifest: dict, files: Dict[str, dict], loaders: Optional[List[str]] = None) -> Dict[str, List[str]]:
+    """
+    Compare current file fingerprints against a stored manifest.
+
+    A stored file that produced no chunks (blank, a parse error or timeout)
+    is recorded with the loaders that were available (see mark_failed_files).
+    It is only retried, as added, when it changes or `loaders` differ.
+
+    Returns:
+        Dictionary with 'added', 'changed', 'removed' and 'unchanged' file names
+    """
+    stored = manifest.get("files", {})
+    diff = {"added": [], "changed": [], "removed": [], "unchanged": []}
+
+    for name, entry in files.items():
+        previous = stored.get(name)
+        if previous is None:
+            diff["added"].append(name)
+        elif previous["sha256"] != entry["sha256"]:
+            diff["changed"].append(name)
+        elif not previous.get("chunk_ids") and previous.get("loaders") != loaders:
+            diff["added"].append(name)
+        else:
+            diff["unchanged"].append(name)
+
+    diff["removed"] = [name for name in stored if name not in files]
+
+    for names in diff.values():
+        names.sort()
+
+    return diff
+
+
+def mark_failed_files(files: Dict[str, dict], names: List[str], loaders: Optional[List[str]] = None):
+    """Record the loaders tried on files that produced no chunks, so they are not re-parsed every run."""
+    for name in names:
+        entry = files[name]
+        if not entry["chunk_ids"]:
+            entry["failed"] = True
+            entry["loaders"] = loaders
+
+
+def load_manifest(cache_dir: str) -> Optional[dict]:
+    """Load the manifest from a cache folder, or None if missing/unreadable."""
+    manifest_path = os.path.join(cache_dir, MANIFEST_FILE)
+
+    if not os.path.exists(manifest_path):
+        return None
+
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_manifest(cache_dir: str, manifest: dict):
+    """Atomically write the manifest to a cache folder."""
+    os.makedirs(cache_dir, exist_ok=True)
+    manifest_path = os.path.join(cache_dir, MANIFEST_FILE)
+
+    with replacing(manifest_path) as tmp_path:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+
+def save_index(vectorstore: FAISS, cache_dir: str, manifest: dict, mmap: bool = True):
+    """
+    Persist the vectorstore and its manifest.
+
+    The chunks are written as a CompactDocstore in FAISS position order,
+    which also encodes index_to_docstore_id. Files are replaced, never
+    rewritten in place, so other processes that have the old ones mapped
+    keep working. With mmap, the vectorstore then switches to the written
+    index file, like load_index. The manifest is written last so an
+    interrupted save never leaves a manifest describing a half-written
+    index.
+    """
+    from compact_docstore import CompactDocstore
+
+    manifest_path = os.path.join(cache_dir, MANIFEST_FILE)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+
+    if not isinstance(vectorstore.docstore, CompactDocstore):
+        vectorstore.docstore = CompactDocstore.from_vectorstore(vectorstore)
+    ids = [vectorstore.index_to_docstore_id[i] for i in range(vectorstore.index.ntotal)]
+    vectorstore.docstore.save(cache_dir, ids)
+    index_path = os.path.join(cache_dir, f"{INDEX_NAME}.faiss")
+    with replacing(index_path) as tmp_path:
+        faiss.write_index(vectorstore.index, tmp_path)
+    if mmap:
+        vectorstore.index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP_IFC)
+
+    save_manifest(cache_dir, manifest)
+
+
+def load_index(cache_dir: str, embeddings, mmap: bool = True) -> FAISS:
+    """
+    Load a vectorstore previously written by save_index.
+
+    With mmap, the FAISS vectors and the chunk text are memory-mapped
+    instead of read: loading is near-instant whatever the index size, and
+    sessions opening the same cache share one copy of the pages. Call
+    make_index_writable() before adding or removing vectors. Raises
+    OSError or ValueError if the cache is incomplete or outdated.
+    """
+    from langchain_community.vectorstores import FAISS
+    from compact_docstore import CompactDocstore
+
+    docstore = CompactDocstore.load(cache_dir, mmap=mmap)
+    index = faiss.read_index(os.path.join(cache_dir, f"{INDEX_NAME}.faiss"), faiss.IO_FLAG_MMAP_IFC if mmap else 0)
+    if index.ntotal != len(docstore):
+        raise ValueError("FAISS index and docstore sizes differ")
+    return FAISS(embeddings, index, docstore, dict(enumerate(docstore.ids)))
+
+
+def make_index_writable(vectorstore: FAISS):
+    """Replace a memory-mapped (read-only) FAISS index with an in-memory copy."""
+    # Adding to or removing from a mapped index aborts inside FAISS
+    vectorstore.index = faiss.deserialize_index(faiss.serialize_index(vectorstore.index))
+    configure_index(vectorstore.index)
+
+
+def scan_catalog(vectorstore: FAISS) -> Dict[str, dict]:
+    """
+    Build a file catalog by scanning the docstore (used when there is no manifest).
+
+    Returns:
+        Dictionary of file name -> catalog entry, like the manifest entries
+    """
+    catalog = {}
+    pages = {}
+
+    for chunk_id in vectorstore.index_to_docstore_id.values():
+        doc = vectorstore.docstore.search(chunk_id)
+        if not hasattr(doc, "metadata") or "source_file" not in doc.metadata:
+            continue
+
+        name = doc.metadata["source_file"]
+        if name not in catalog:
+            source = doc.metadata.get("source")
+            catalog[name] = {
+                "path": source,
+                "size": os.path.getsize(source) if source and os.path.exists(source) else None,
+                "file_type": doc.metadata.get("file_type", Path(name).suffix.lower().lstrip('.')),
+                "pages": 0,
+                "ingested_at": None,
+                "chunk_ids": [],
+            }
+            pages[name] = set()
+
+        catalog[name]["chunk_ids"].append(chunk_id)
+        pages[name].add(doc.metadata.get("page"))
+
+    for name, entry in catalog.items():
+        entry["pages"] = len(pages[name])
+
+    return catalog
+
+
+def carry_over_entry(entry: dict, stored: dict) -> dict:
+    """Keep the ingest results (chunk ids, catalog info) of an unchanged file."""
+    for key, value in stored.items():
+        if key not in ("path", "size", "mtime", "sha256"):
+            entry[key] = value
+    return entry
+
+
+def map_file_positions(vectorstore: FAISS, catalog: Dict[str, dict]) -> Dict[str, np.ndarray]:
+    """Translate each catalogued file's chunk ids into row positions in the FAISS index."""
+    id_to_position = {chunk_id: position for position, chunk_id in vectorstore.index_to_docstore_id.items()}
+    return {
+        name: np.array([id_to_position[i] for i in entry["chunk_ids"] if i in id_to_position], dtype=np.int64)
+        for name, entry in catalog.items()
+    }
+
+
+def search_positions(vectorstore: FAISS, embedding: List[float], positions: np.ndarray, k: int,
+                     full_vectors: Optional[np.ndarray] = None) -> List[Document]:
+    """
+    Exact nearest-neighbour search restricted to the given index rows.
+
+    Only the selected vectors are reconstructed (or read from full_vectors,
+    when given) and compared, so searching a single file costs O(file chunks)
+    rather than O(corpus), and always returns min(k, len(positions)) results.
+    """
+    if len(positions) == 0:
+        return []
+
+    if full_vectors is not None:
+        vectors = np.asarray(full_vectors[positions])
+    else:
+        vectors = vectorstore.index.reconstruct_batch(positions)
+    query = np.asarray(embedding, dtype=np.float32)
+    distances = ((vectors - query) ** 2).sum(axis=1)
+
+    k = min(k, len(positions))
+    top = np.argpartition(distances, k - 1)[:k]
+    top = top[np.argsort(distances[top])]
+
+    return [
+        vectorstore.docstore.search(vectorstore.index_to_docstore_id[int(positions[i])])
+        for i in top
+    ]
+
+
+def choose_index_factory(num_vectors: int, dim: int, override: Optional[str] = None,
+                         precision: str = "float32") -> str:
+    """
+    Pick a FAISS index factory string for a corpus size.
+
+    Flat (exact) for small corpora, HNSW for mid-size ones and IVF-PQ (about
+    16 dimensions per sub-quantizer code byte) for large ones. With a float16
+    or int8 precision, Flat and HNSW store scalar-quantized vectors (2x / 4x
+    smaller). An override other than "auto" is returned as is.
+    """
+    if override and override.lower() != "auto":
+        return override
+
+    if precision not in PRECISION_CODECS:
+        raise ValueError(f"Unknown vector precision '{precision}' (use {', '.join(PRECISION_CODECS)})")
+    codec = PRECISION_CODECS[precision]
+
+    if num_vectors < FLAT_INDEX_MAX:
+        return codec or "Flat"
+    if num_vectors < HNSW_INDEX_MAX:
+        return f"HNSW32,{codec}" if codec else "HNSW32"
+    return ivf_pq_factory(num_vectors, dim)
+
+
+def ivf_pq_factory(num_vectors: int, dim: int) -> str:
+    """IVF-PQ factory string sized for a corpus: ~4*sqrt(n) lists, 16 dims per code byte."""
+    nlist = 1 << int(round(math.log2(4 * math.sqrt(max(num_vectors, 1)))))
+    # k-means needs roughly 39 training points per list
+    while nlist > 1 and nlist * 39 > num_vectors:
+        nlist //= 2
+    m = max(d for d in range(1, max(1, dim // 16) + 1) if dim % d == 0)
+    return f"IVF{nlist},PQ{m}"
+
+
+def build_index(vectors: np.ndarray, factory: str, seed: int = 0):
+    """Build (and train, if needed) a FAISS index of the given type over the vectors."""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    index = faiss.index_factory(vectors.shape[1], factory)
+
+    if not index.is_trained:
+        ivf = faiss.try_extract_index_ivf(index)
+        train_size = max(256, (ivf.nlist if ivf is not None else 256) * TRAIN_POINTS_PER_LIST)
+        sample = vectors
+        if len(vectors) > train_size:
+            rng = np.random.default_rng(seed)
+            sample = vectors[np.sort(rng.choice(len(vectors), train_size, replace=False))]
+        index.train(sample)
+
+    configure_index(index)
+    index.add(vectors)
+    return index
+
+
+def configure_index(index):
+    """Apply search-time settings (HNSW efSearch, IVF nprobe and direct map)."""
+    hnsw = getattr(faiss.downcast_index(index), "hnsw", None)
+    if hnsw is not None:
+        hnsw.efSearch = max(hnsw.efSearch, HNSW_EF_SEARCH)
+
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(ivf.nlist, IVF_NPROBE)
+        # Lets quiz clustering and per-file search reconstruct vectors by position
+        ivf.make_direct_map()
+
+
+def save_full_vectors(cache_dir: str, vectors: np.ndarray, batch_size: int = 10000):
+    """Write full-precision vectors (in index order) as a raw float32 file."""
+    path = os.path.join(cache_dir, VECTORS_FILE)
+    with replacing(path) as tmp_path:
+        with open(tmp_path, 'wb') as f:
+            for start in range(0, len(vectors), batch_size):
+                np.ascontiguousarray(vectors[start:start + batch_size], dtype=np.float32).tofile(f)
+
+
+def update_full_vectors(cache_dir: str, keep: np.ndarray, new_vectors: np.ndarray, dim: int,
+                        batch_size: int = 10000) -> bool:
+    """
+    Rewrite the full-precision vectors file after an in-place index update.
+
+    Rows where `keep` is False are dropped and `new_vectors` appended,
+    streaming in batches so the whole file is never held in memory.
+    Returns False if the current file is missing or does not match `keep`.
+    """
+    stored = load_full_vectors(cache_dir, len(keep), dim)
+    if stored is None:
+        return False
+
+    with replacing(os.path.join(cache_dir, VECTORS_FILE)) as tmp_path:
+        with open(tmp_path, 'wb') as f:
+            for start in range(0, len(keep), batch_size):
+                rows = stored[start:start + batch_size][keep[start:start + batch_size]]
+                np.ascontiguousarray(rows, dtype=np.float32).tofile(f)
+            np.ascontiguousarray(new_vectors, dtype=np.float32).tofile(f)
+        # Unmap before the file is replaced
+        del stored
+    return True
+
+
+def load_full_vectors(cache_dir: str, num_vectors: int, dim: int, mmap: bool = True) -> Optional[np.ndarray]:
+    """
+    Memory-map (or, without mmap, read) the full-precision vectors file.
+
+    Returns None if the file is missing or the wrong size.
+    """
+    path = os.path.join(cache_dir, VECTORS_FILE)
+    if num_vectors == 0 or not os.path.exists(path) or os.path.getsize(path) != num_vectors * dim * 4:
+        return None
+    if not mmap:
+        return np.fromfile(path, dtype=np.float32).reshape(num_vectors, dim)
+    return np.memmap(path, dtype=np.float32, mode='r', shape=(num_vectors, dim))
+
+
+def search_index(vectorstore: FAISS, embedding: List[float], k: int,
+                 full_vectors: Optional[np.ndarray] = None) -> List[Document]:
+    """
+    Nearest-neighbour search, optionally re-ranked with full-precision vectors.
+
+    With full_vectors (e.g. the memory-mapped vectors file of a quantized
+    index), RERANK_FACTOR * k candidates are fetched from the index and only
+    those rows are read back to compute exact L2 distances.
+    """
+    index = vectorstore.index
+    if index.ntotal == 0 or k <= 0:
+        return []
+
+    query = np.asarray([embedding], dtype=np.float32)
+    fetch = k * RERANK_FACTOR if full_vectors is not None else k
+    _, positions = index.search(query, min(fetch, index.ntotal))
+    positions = positions[0][positions[0] >= 0]
+
+    if full_vectors is not None and len(positions) > 1:
+        # Read the candidate rows in file order
+        rows = np.sort(positions)
+        distances = ((np.asarray(full_vectors[rows]) - query) ** 2).sum(axis=1)
+        positions = rows[np.argsort(distances, kind="stable")[:k]]
+
+    return [vectorstore.docstore.search(vectorstore.index_to_docstore_id[int(p)]) for p in positions[:k]]
+
+
+def is_lossless_index(index) -> bool:
+    """Whether reconstruct() returns the exact stored vectors."""
+    return isinstance(faiss.downcast_index(index), (faiss.IndexFlat, faiss.IndexHNSWFlat))
+
+
+def supports_removal(index) -> bool:
+    """Whether vectors can be removed in place (HNSW graphs cannot)."""
+    return getattr(faiss.downcast_index(index), "hnsw", None) is None
+
+
+def delete_chunks(vectorstore: FAISS, chunk_ids: List[str]) -> np.ndarray:
+    """
+    Remove chunks from a vectorstore in place.
+
+    LangChain's FAISS.delete assumes later vectors shift down one position
+    per removed vector, as in flat-storage indexes. IVF indexes keep their
+    ids instead, so their inverted lists are renumbered the same way.
+
+    Returns:
+        Boolean mask over the previous positions, False for removed rows
+    """
+    id_to_position = {chunk_id: position for position, chunk_id in vectorstore.index_to_docstore_id.items()}
+    keep = np.ones(vectorstore.index.ntotal, dtype=bool)
+    keep[[id_to_position[chunk_id] for chunk_id in chunk_ids]] = False
+
+    ivf = faiss.try_extract_index_ivf(vectorstore.index)
+    if ivf is not None:
+        # The position -> list direct map does not support removal
+        ivf.make_direct_map(False)
+
+    vectorstore.delete(chunk_ids)
+
+    if ivf is not None:
+        renumber = np.cumsum(keep, dtype=np.int64) - 1
+        for list_no in range(ivf.nlist):
+            size = ivf.invlists.list_size(list_no)
+            if size:
+                ids = faiss.rev_swig_ptr(ivf.invlists.get_ids(list_no), size)
+                ids[:] = renumber[ids]
+        configure_index(vectorstore.index)
+
+    return keep
+
+
+def benchmark_index_factories(vectors: np.ndarray, factories: List[str], num_queries: int = 200,
+                              k: int = 4, seed: int = 0) -> List[dict]:
+    """
+    Compare index types on the given vectors.
+
+    Queries are stored vectors with a little noise added; recall@k is
+    measured against exact (flat) search.
+
+    Returns:
+        One dict per factory with build_s, query_ms, recall and size_mb, or
+        an error message if the index could not be built
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(len(vectors), min(num_queries, len(vectors)), replace=False)
+    noise = rng.normal(scale=float(vectors.std()) * 0.1, size=(len(picks), vectors.shape[1]))
+    queries = (vectors[picks] + noise).astype(np.float32)
+
+    exact = faiss.IndexFlatL2(vectors.shape[1])
+    exact.add(vectors)
+    _, truth = exact.search(queries, k)
+
+    results = []
+    for factory in factories:
+        try:
+            start = time.perf_counter()
+            index = build_index(vectors, factory, seed=seed)
+            build_s = time.perf_counter() - start
+        except Exception as e:
+            results.append({"factory": factory, "error": str(e)})
+            continue
+
+        found = np.empty_like(truth)
+        start = time.perf_counter()
+        for i in range(len(queries)):
+            _, found[i:i + 1] = index.search(queries[i:i + 1], k)
+        query_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+        recall = np.mean([len(set(f) & set(t)) / k for f, t in zip(found.tolist(), truth.tolist())])
+        results.append({
+            "factory": factory,
+            "build_s": build_s,
+            "query_ms": query_ms,
+            "recall": float(recall),
+            "size_mb": len(faiss.serialize_index(index)) / 1e6,
+        })
+
+    return results
@@ -0,0 +1,191 @@
+"""
+Quiz Bank
+Stores pre-generated questions on disk, in one pool per source file (plus
+one for the whole corpus), and fills the pools in a background thread so
+quizzes can be served without waiting on the LLM.
+"""
+
+import os
+import json
+import threading
+from typing import List, Dict, Callable, Optional, Tuple
+
+from index_store import replacing
+from quiz_parser import Question
+
+QUIZ_BANK_VERSION = 1
+ALL_FILES = "*"   # Pool name for quizzes over the whole corpus
+
+
+def _stem_key(question: Question) -> str:
+    return " ".join(question.stem.lower().split())
+
+
+class QuizBank:
+    """
+    Persistent pools of unused questions.
+
+    Each pool is stored with a fingerprint of the chunks it was generated
+    from; when the fingerprint changes (the file was re-ingested) the pool
+    is discarded instead of serving questions about stale content. Served
+    questions are removed so they are not asked twice.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.generated = 0
+        self.served = 0
+        self._pools = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        if data.get("version") != QUIZ_BANK_VERSION:
+            return
+
+        for name, pool in data.get("pools", {}).items():
+            self._pools[name] = {
+                "fingerprint": pool["fingerprint"],
+                "questions": [Question.from_dict(q) for q in pool["questions"]],
+            }
+
+    def _save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        data = {
+            "version": QUIZ_BANK_VERSION,
+            "pools": {
+                name: {
+                    "fingerprint": pool["fingerprint"],
+                    "questions": [q.to_dict() for q in pool["questions"]],
+                }
+                for name, pool in self._pools.items()
+            },
+        }
+        with replacing(self.path) as tmp_path:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+
+    def _pool(self, name: str, fingerprint: str) -> list:
+        pool = self._pools.get(name)
+        if pool is None or pool["fingerprint"] != fingerprint:
+            pool = self._pools[name] = {"fingerprint": fingerprint, "questions": []}
+        return pool["questions"]
+
+    def count(self, name: str, fingerprint: str) -> int:
+        """Number of unused questions in a pool."""
+        with self._lock:
+            pool = self._pools.get(name)
+            if pool is None or pool["fingerprint"] != fingerprint:
+                return 0
+            return len(pool["questions"])
+
+    def add(self, name: str, fingerprint: str, questions: List[Question]) -> int:
+        """Add questions to a pool, skipping duplicates; returns how many were added."""
+        with self._lock:
+            pool = self._pool(name, fingerprint)
+            seen = {_stem_key(q) for q in pool}
+            added = 0
+            for question in questions:
+                key = _stem_key(question)
+                if key not in seen:
+                    seen.add(key)
+                    pool.append(question)
+                    added += 1
+            self.generated += added
+            self._save()
+            return added
+
+    def take(self, name: str, fingerprint: str, num_questions: int) -> List[Question]:
+        """Remove and return num_questions questions, or [] if the pool has too few."""
+        with self._lock:
+            pool = self._pool(name, fingerprint)
+            if num_questions <= 0 or len(pool) < num_questions:
+                return []
+            questions = pool[:num_questions]
+            del pool[:num_questions]
+            self.served += len(questions)
+            self._save()
+            return questions
+
+    def stats(self) -> Dict[str, int]:
+        """Return stored, generated and served question counts."""
+        with self._lock:
+            stored = sum(len(pool["questions"]) for pool in self._pools.values())
+            return {"stored": stored, "generated": self.generated, "served": self.served}
+
+
+class QuizBankFiller(threading.Thread):
+    """
+    Background thread that tops pools up to `target` questions.
+
+    Each target is (pool name, fingerprint, generate) where generate(n)
+    returns up to n new questions. `targets` are always kept filled, in
+    order. `on_demand` pools (by name) are only filled once demand() was
+    called for them, most recently demanded first, and only the last
+    `max_on_demand` of them, so a large corpus does not queue an LLM call
+    per file. The thread sleeps until wake() is called (e.g. after
+    questions were served) and exits on stop().
+    """
+
+    def __init__(self, bank: QuizBank, targets: List[Tuple[str, str, Callable[[int], List[Question]]]], target: int,
+                 on_demand: Optional[Dict[str, Tuple[str, Callable[[int], List[Question]]]]] = None, max_on_demand: int = 4):
+        super().__init__(daemon=True)
+        self.bank = bank
+        self.targets = targets
+        self.target = target
+        self.on_demand = on_demand or {}
+        self.max_on_demand = max_on_demand
+        self.errors = 0
+        self._demanded = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
+
+    def wake(self):
+        """Check the pools again (call after serving questions)."""
+        self._wake.set()
+
+    def demand(self, name: str):
+        """Start (or keep) filling an on-demand pool, e.g. after a quiz on its file."""
+        if name not in self.on_demand or self.max_on_demand <= 0:
+            return
+        with self._lock:
+            if name in self._demanded:
+                self._demanded.remove(name)
+            self._demanded.insert(0, name)
+            del self._demanded[self.max_on_demand:]
+        self._wake.set()
+
+    def _active_targets(self) -> list:
+        with self._lock:
+            demanded = list(self._demanded)
+        return self.targets + [(name,) + self.on_demand[name] for name in demanded]
+
+    def stop(self):
+        """Stop after the current generation finishes."""
+        self._stop_event.set()
+        self._wake.set()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            self._wake.clear()
+            for name, fingerprint, generate in self._active_targets():
+                if self._stop_event.is_set():
+                    return
+                missing = self.target - self.bank.count(name, fingerprint)
+                if missing <= 0:
+                    continue
+                try:
+                    questions = generate(missing)
+                except Exception:
+                    # Leave the pool for the next round; live generation still works
+                    self.errors += 1
+                    continue
+                self.bank.add(name, fingerprint, questions)
+            self._wake.wait()
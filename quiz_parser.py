@@ -0,0 +1,168 @@
+"""
+Quiz Parser
+Turns the LLM's "Q1: / A) / Correct Answer: / Explanation:" quiz text into
+Question objects, incrementally, so questions can be used as soon as they
+are complete while the quiz is still streaming.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Dict, Tuple, Iterable, Iterator
+
+# Tolerates markdown bold, "Question 1." headings, "(A)"/"A." options and
+# "Answer: B) text" style answers
+_QUESTION = re.compile(r"^\W*(?:Q|Question\s*)(\d+)\s*[:.)]\W*(.*)$", re.IGNORECASE)
+_OPTION = re.compile(r"^\W*\(?([A-Da-d])\s*[).:]\s*(.*)$")
+_ANSWER = re.compile(r"^\W*(?:Correct\s+)?Answer\s*:\W*\(?([A-Da-d])\b[).:]?\s*(.*)$", re.IGNORECASE)
+_EXPLANATION = re.compile(r"^\W*Explanation\s*:\W*(.*)$", re.IGNORECASE)
+
+
+@dataclass(slots=True)
+class Question:
+    """A multiple-choice question parsed from a generated quiz."""
+    stem: str
+    options: Dict[str, str]
+    answer: str
+    explanation: str = ""
+    source_chunk_ids: Tuple[str, ...] = ()
+
+    def format(self, number: int) -> str:
+        """Render the question in the quiz text format."""
+        lines = [f"Q{number}: {self.stem}"]
+        lines += [f"{letter}) {text}" for letter, text in self.options.items()]
+        lines.append(f"Correct Answer: {self.answer}")
+        if self.explanation:
+            lines.append(f"Explanation: {self.explanation}")
+        return "\n".join(lines)
+
+    def to_dict(self) -> dict:
+        """Return a JSON-serialisable dictionary."""
+        return {
+            "stem": self.stem,
+            "options": dict(self.options),
+            "answer": self.answer,
+            "explanation": self.explanation,
+            "source_chunk_ids": list(self.source_chunk_ids),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Question":
+        """Rebuild a question from to_dict() output."""
+        return cls(
+            stem=data["stem"],
+            options=dict(data["options"]),
+            answer=data["answer"],
+            explanation=data.get("explanation", ""),
+            source_chunk_ids=tuple(data.get("source_chunk_ids", ())),
+        )
+
+
+def _clean(text: str) -> str:
+    return text.strip().strip("*").strip()
+
+
+class QuizParser:
+    """
+    Incremental parser for generated quiz text.
+
+    Feed it text chunks as they stream in; each call returns the questions
+    completed so far. A question is complete when the next one starts (or
+    at close()), and is only kept if it has a stem, at least two options and
+    an answer that is one of them, so a truncated final question is dropped.
+    """
+
+    def __init__(self, source_chunk_ids: Iterable[str] = ()):
+        self.source_chunk_ids = tuple(source_chunk_ids)
+        self._buffer = ""
+        self._current = None
+        self._field = None
+
+    def feed(self, text: str) -> List[Question]:
+        """Consume a chunk of text and return newly completed questions."""
+        self._buffer += text
+        *lines, self._buffer = self._buffer.split("\n")
+        return [question for line in lines for question in self._parse_line(line)]
+
+    def close(self) -> List[Question]:
+        """Flush the remaining text and return the last completed questions."""
+        questions = self._parse_line(self._buffer)
+        self._buffer = ""
+        finished = self._finish()
+        if finished:
+            questions.append(finished)
+        return questions
+
+    def _parse_line(self, line: str) -> List[Question]:
+        if not line.strip():
+            return []
+
+        match = _QUESTION.match(line)
+        if match:
+            finished = self._finish()
+            self._current = {"stem": _clean(match.group(2)), "options": {}, "answer": "", "explanation": ""}
+            self._field = ("stem", None)
+            return [finished] if finished else []
+
+        # Text before the first question (e.g. "Here are 5 questions:")
+        if self._current is None:
+            return []
+
+        match = _ANSWER.match(line)
+        if match:
+            self._current["answer"] = match.group(1).upper()
+            self._field = None
+            return []
+
+        match = _EXPLANATION.match(line)
+        if match:
+            self._current["explanation"] = _clean(match.group(1))
+            self._field = ("explanation", None)
+            return []
+
+        match = _OPTION.match(line)
+        if match and not self._current["answer"]:
+            letter = match.group(1).upper()
+            self._current["options"][letter] = _clean(match.group(2))
+            self._field = ("options", letter)
+            return []
+
+        # Continuation of a wrapped stem, option or explanation
+        if self._field is not None:
+            name, letter = self._field
+            if name == "options":
+                self._current["options"][letter] = f"{self._current['options'][letter]} {_clean(line)}".strip()
+            else:
+                self._current[name] = f"{self._current[name]} {_clean(line)}".strip()
+        return []
+
+    def _finish(self) -> Optional[Question]:
+        current, self._current, self._field = self._current, None, None
+        if not current or not current["stem"] or len(current["options"]) < 2:
+            return None
+        if current["answer"] not in current["options"]:
+            return None
+        return Question(
+            stem=current["stem"],
+            options=current["options"],
+            answer=current["answer"],
+            explanation=current["explanation"],
+            source_chunk_ids=self.source_chunk_ids,
+        )
+
+
+def iter_questions(chunks: Iterable[str], source_chunk_ids: Iterable[str] = ()) -> Iterator[Question]:
+    """Parse a stream of quiz text chunks, yielding each question once complete."""
+    parser = QuizParser(source_chunk_ids)
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
+
+
+def parse_questions(text: str, source_chunk_ids: Iterable[str] = ()) -> List[Question]:
+    """Parse a complete quiz text into questions."""
+    return list(iter_questions([text], source_chunk_ids))
+
+
+def format_quiz(questions: List[Question]) -> str:
+    """Render questions back into numbered quiz text."""
+    return "\n\n".join(question.format(number) for number, question in enumerate(questions, 1))
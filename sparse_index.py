@@ -0,0 +1,248 @@
+"""
+Sparse Keyword Index
+BM25 inverted index over the chunk texts, stored as flat NumPy posting
+arrays next to the FAISS index, plus reciprocal-rank fusion for combining
+keyword and vector results. Catches exact terms (formulas, names) that
+embedding similarity can miss.
+"""
+
+import os
+import re
+import math
+from typing import List, Iterable, Tuple
+
+import numpy as np
+
+from index_store import replacing, encode_strings, decode_strings
+
+SPARSE_INDEX_FILE = "sparse.npz"
+SPARSE_INDEX_VERSION = 2
+
+_TOKEN = re.compile(r"\w+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have how in is it its of on or that the "
+    "this to was were what when where which who why will with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without common stopwords."""
+    return [token for token in _TOKEN.findall(text.lower()) if token not in _STOPWORDS]
+
+
+def reciprocal_rank_fusion(rankings: Iterable[List[str]], k: int = 60) -> List[str]:
+    """Fuse ranked id lists by summing 1 / (k + rank); returns ids best first."""
+    scores = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, 1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+class SparseIndex:
+    """
+    BM25 index keyed by chunk id.
+
+    Postings are kept in CSR form: one sorted vocabulary, an offsets array
+    and flat int32 document / uint16 term-frequency arrays. Chunks added
+    since the last freeze() sit in small per-term lists until the next
+    search or save. Removed chunks are tombstoned and dropped on compaction.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.chunk_ids = []
+        self._doc_lengths = []
+        self._deleted = set()
+        self._ordinals = {}
+        self._vocab = {}
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._docs = np.zeros(0, dtype=np.int32)
+        self._tfs = np.zeros(0, dtype=np.uint16)
+        self._pending = {}
+        self._norms = None
+
+    def __len__(self) -> int:
+        return len(self.chunk_ids) - len(self._deleted)
+
+    def live_ids(self) -> set:
+        """Chunk ids currently searchable."""
+        return {chunk_id for i, chunk_id in enumerate(self.chunk_ids) if i not in self._deleted}
+
+    def add(self, chunk_id: str, text: str):
+        """Index a chunk's text."""
+        ordinal = len(self.chunk_ids)
+        self.chunk_ids.append(chunk_id)
+        self._ordinals[chunk_id] = ordinal
+
+        counts = {}
+        tokens = tokenize(text)
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        self._doc_lengths.append(len(tokens))
+        self._norms = None
+
+        for token, count in counts.items():
+            docs, tfs = self._pending.setdefault(token, ([], []))
+            docs.append(ordinal)
+            tfs.append(min(count, 65535))
+
+    def remove(self, chunk_ids: Iterable[str]):
+        """Remove chunks from search results."""
+        for chunk_id in chunk_ids:
+            ordinal = self._ordinals.pop(chunk_id, None)
+            if ordinal is not None:
+                self._deleted.add(ordinal)
+
+    def freeze(self):
+        """Merge pending postings into the flat arrays, compacting if many chunks were removed."""
+        if len(self._deleted) > len(self.chunk_ids) // 4:
+            self._compact()
+        if not self._pending:
+            return
+
+        terms = sorted(set(self._vocab) | set(self._pending))
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        docs_parts, tfs_parts = [], []
+
+        for i, term in enumerate(terms):
+            size = 0
+            old = self._vocab.get(term)
+            if old is not None:
+                start, end = self._offsets[old], self._offsets[old + 1]
+                docs_parts.append(self._docs[start:end])
+                tfs_parts.append(self._tfs[start:end])
+                size += end - start
+            new = self._pending.get(term)
+            if new is not None:
+                docs_parts.append(np.asarray(new[0], dtype=np.int32))
+                tfs_parts.append(np.asarray(new[1], dtype=np.uint16))
+                size += len(new[0])
+            offsets[i + 1] = offsets[i] + size
+
+        self._vocab = {term: i for i, term in enumerate(terms)}
+        self._offsets = offsets
+        self._docs = np.concatenate(docs_parts) if docs_parts else np.zeros(0, dtype=np.int32)
+        self._tfs = np.concatenate(tfs_parts) if tfs_parts else np.zeros(0, dtype=np.uint16)
+        self._pending = {}
+
+    def _compact(self):
+        # Rebuild ordinals without the tombstoned chunks
+        keep = np.array([i not in self._deleted for i in range(len(self.chunk_ids))], dtype=bool)
+        remap = np.cumsum(keep, dtype=np.int64) - 1
+
+        postings = {}
+        for term, index in self._vocab.items():
+            start, end = self._offsets[index], self._offsets[index + 1]
+            postings[term] = (self._docs[start:end], self._tfs[start:end])
+        for term, (docs, tfs) in self._pending.items():
+            old_docs, old_tfs = postings.get(term, (np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.uint16)))
+            postings[term] = (
+                np.concatenate([old_docs, np.asarray(docs, dtype=np.int32)]),
+                np.concatenate([old_tfs, np.asarray(tfs, dtype=np.uint16)]),
+            )
+
+        terms, offsets, docs_parts, tfs_parts = [], [0], [], []
+        for term in sorted(postings):
+            docs, tfs = postings[term]
+            mask = keep[docs]
+            if not mask.any():
+                continue
+            terms.append(term)
+            docs_parts.append(remap[docs[mask]].astype(np.int32))
+            tfs_parts.append(tfs[mask])
+            offsets.append(offsets[-1] + int(mask.sum()))
+
+        self.chunk_ids = [chunk_id for i, chunk_id in enumerate(self.chunk_ids) if keep[i]]
+        self._doc_lengths = [length for i, length in enumerate(self._doc_lengths) if keep[i]]
+        self._ordinals = {chunk_id: i for i, chunk_id in enumerate(self.chunk_ids)}
+        self._deleted = set()
+        self._norms = None
+        self._vocab = {term: i for i, term in enumerate(terms)}
+        self._offsets = np.asarray(offsets, dtype=np.int64)
+        self._docs = np.concatenate(docs_parts) if docs_parts else np.zeros(0, dtype=np.int32)
+        self._tfs = np.concatenate(tfs_parts) if tfs_parts else np.zeros(0, dtype=np.uint16)
+        self._pending = {}
+
+    def search(self, query: str, k: int) -> List[Tuple[str, float]]:
+        """Return up to k (chunk id, BM25 score) pairs, best first."""
+        self.freeze()
+        num_docs = len(self)
+        if num_docs == 0 or k <= 0:
+            return []
+
+        if self._norms is None:
+            # BM25 length normalisation per chunk
+            lengths = np.asarray(self._doc_lengths, dtype=np.float32)
+            average_length = float(lengths.mean()) or 1.0
+            self._norms = self.k1 * (1 - self.b + self.b * lengths / average_length)
+        norms = self._norms
+        scores = np.zeros(len(self.chunk_ids), dtype=np.float32)
+
+        for term in set(tokenize(query)):
+            index = self._vocab.get(term)
+            if index is None:
+                continue
+            start, end = self._offsets[index], self._offsets[index + 1]
+            docs = self._docs[start:end]
+            tfs = self._tfs[start:end].astype(np.float32)
+            idf = math.log(1 + (num_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            scores[docs] += idf * tfs * (self.k1 + 1) / (tfs + norms[docs])
+
+        if self._deleted:
+            scores[list(self._deleted)] = 0
+
+        matched = np.flatnonzero(scores > 0)
+        if len(matched) == 0:
+            return []
+        top = matched[np.argsort(-scores[matched], kind="stable")[:k]]
+        return [(self.chunk_ids[i], float(scores[i])) for i in top]
+
+    def save(self, cache_dir: str):
+        """Write the index to SPARSE_INDEX_FILE in a cache folder."""
+        self.freeze()
+        if self._deleted:
+            self._compact()
+
+        path = os.path.join(cache_dir, SPARSE_INDEX_FILE)
+        with replacing(path) as tmp_path, open(tmp_path, 'wb') as f:
+            np.savez(
+                f,
+                version=np.array([SPARSE_INDEX_VERSION]),
+                params=np.array([self.k1, self.b]),
+                chunk_ids=encode_strings(self.chunk_ids),
+                doc_lengths=np.asarray(self._doc_lengths, dtype=np.int32),
+                vocab=encode_strings(sorted(self._vocab, key=self._vocab.get)),
+                offsets=self._offsets,
+                docs=self._docs,
+                tfs=self._tfs,
+            )
+
+    @classmethod
+    def load(cls, cache_dir: str) -> "SparseIndex":
+        """Load an index written by save(); raises OSError/ValueError if missing or outdated."""
+        with np.load(os.path.join(cache_dir, SPARSE_INDEX_FILE), allow_pickle=False) as data:
+            if int(data["version"][0]) != SPARSE_INDEX_VERSION:
+                raise ValueError("Unsupported sparse index version")
+            k1, b = data["params"].tolist()
+            index = cls(k1=k1, b=b)
+            index.chunk_ids = decode_strings(data["chunk_ids"])
+            index._doc_lengths = data["doc_lengths"].tolist()
+            index._vocab = {term: i for i, term in enumerate(decode_strings(data["vocab"]))}
+            index._offsets = data["offsets"]
+            index._docs = data["docs"]
+            index._tfs = data["tfs"]
+        index._ordinals = {chunk_id: i for i, chunk_id in enumerate(index.chunk_ids)}
+        return index
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore) -> "SparseIndex":
+        """Build an index from every chunk in a FAISS vectorstore's docstore."""
+        index = cls()
+        for chunk_id in vectorstore.index_to_docstore_id.values():
+            doc = vectorstore.docstore.search(chunk_id)
+            if hasattr(doc, "page_content"):
+                index.add(chunk_id, doc.page_content)
+        index.freeze()
+        return index
@@ -0,0 +1,88 @@
+"""
+Startup Timing
+Imports the heavy third-party modules (boto3, LangChain, FAISS bindings,
+loaders) in a background thread while the app waits for the user's first
+input, and records how long each import and startup stage took.
+"""
+
+import sys
+import time
+import importlib
+import threading
+from typing import List, Optional
+
+STARTED_AT = time.perf_counter()  # Set when app.py imports this module first
+
+# Imported by warm_up_imports(), roughly in the order the app needs them
+HEAVY_MODULES = [
+    "boto3",
+    "langchain_aws",
+    "langchain_community.vectorstores.faiss",
+    "langchain_community.document_loaders.pdf",
+    "langchain_text_splitters",
+    "langchain_classic.chains.retrieval",
+    "langchain_classic.chains.combine_documents",
+    "embedding_cache",
+    "embedding_pipeline",
+    "compact_docstore",
+    "context_packer",
+]
+
+_import_times = []  # (module, seconds), first import only
+_stages = []        # (stage, seconds since STARTED_AT)
+_lock = threading.Lock()
+
+
+def timed_import(name: str):
+    """Import a module, recording the time taken if it was not loaded yet."""
+    if name in sys.modules:
+        return sys.modules[name]
+
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    with _lock:
+        _import_times.append((name, time.perf_counter() - start))
+    return module
+
+
+def warm_up_imports(modules: Optional[List[str]] = None) -> threading.Thread:
+    """
+    Import modules in a daemon thread and return it.
+
+    Modules that cannot be imported are skipped; the code that needs them
+    reports the error when it runs. A module the main thread needs before
+    the thread reaches it is simply imported there (Python's import lock
+    makes the two wait for each other instead of importing twice).
+    """
+    def run():
+        for name in modules or HEAVY_MODULES:
+            try:
+                timed_import(name)
+            except Exception:
+                pass
+
+    thread = threading.Thread(target=run, daemon=True, name="warm-up-imports")
+    thread.start()
+    return thread
+
+
+def mark_stage(stage: str, since: float = STARTED_AT):
+    """Record how long a stage took (by default, time since startup)."""
+    with _lock:
+        _stages.append((stage, time.perf_counter() - since))
+
+
+def print_startup_report():
+    """Print the recorded stage times and per-module import times."""
+    with _lock:
+        stages = list(_stages)
+        import_times = sorted(_import_times, key=lambda item: item[1], reverse=True)
+
+    print("⏱️  Startup timing:")
+    for stage, seconds in stages:
+        print(f"   • {stage}: {seconds:.2f}s")
+    if import_times:
+        print(f"   Imports ({sum(seconds for _, seconds in import_times):.2f}s total):")
+        for name, seconds in import_times:
+            print(f"      {seconds * 1000:7.0f} ms  {name}")
+    print()
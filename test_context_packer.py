@@ -0,0 +1,45 @@
+"""
+Context Packer Tests
+Checks how pack_documents merges retrieved chunks: python -m pytest -q
+"""
+
+from langchain_core.documents import Document
+
+from context_packer import GAP_MARKER, pack_documents
+
+
+def _chunk(text, chunk_id, **metadata):
+    return Document(page_content=text, metadata={"source_file": "notes.csv", **metadata}, id=chunk_id)
+
+
+def test_rows_of_one_file_are_all_kept():
+    # CSVLoader returns one document per row, so every row chunk starts at 0
+    rows = [
+        _chunk("name: Sirius, type: main sequence", "a", row=0, start_index=0),
+        _chunk("name: Betelgeuse, type: red supergiant", "b", row=1, start_index=0),
+    ]
+
+    packed = pack_documents(rows)
+
+    assert [doc.page_content for doc in packed] == [doc.page_content for doc in rows]
+
+    # Older caches have no row or section: the texts are matched instead
+    for doc in rows:
+        del doc.metadata["row"]
+    packed = pack_documents(rows)
+
+    assert packed[0].page_content == GAP_MARKER.join(doc.page_content for doc in rows)
+    assert packed[0].metadata["chunk_ids"] == ["a", "b"]
+
+
+def test_overlapping_chunks_of_one_page_are_merged_once():
+    page = "Stars form in molecular clouds. " * 3 + "Red giants are late-stage stars."
+    first = _chunk(page[:70], "a", source_file="stars.pdf", page=2, start_index=0)
+    second = _chunk(page[40:], "b", source_file="stars.pdf", page=2, start_index=40)
+
+    packed = pack_documents([second, first])
+
+    assert len(packed) == 1
+    assert packed[0].page_content == page
+    assert packed[0].metadata["citation"] == "stars.pdf, page 3"
+    assert packed[0].metadata["chunk_ids"] == ["b", "a"]
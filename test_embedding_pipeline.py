@@ -0,0 +1,76 @@
+"""
+Embedding Pipeline Tests
+Runs ConcurrentEmbeddings against a local fake Bedrock runtime client that
+throttles, so no AWS access is needed (pip install -r requirements-dev.txt,
+then python -m pytest -q)
+"""
+
+import io
+import json
+import threading
+
+from langchain_aws import BedrockEmbeddings
+
+from embedding_pipeline import AdaptiveConcurrency, ConcurrentEmbeddings
+from utils import EMBEDDING_MODEL_ID
+
+
+class ThrottlingException(Exception):
+    """Shaped like the botocore ClientError Bedrock raises when throttling."""
+
+    def __init__(self):
+        super().__init__("Rate exceeded")
+        self.response = {"Error": {"Code": "ThrottlingException"}}
+
+
+class FakeBedrockClient:
+    """Bedrock runtime stub: throttles the first `throttles` calls per text, then embeds it."""
+
+    def __init__(self, throttles: int = 1):
+        self.throttles = throttles
+        self.calls = {}
+        self._lock = threading.Lock()
+
+    def invoke_model(self, body, modelId, accept, contentType):
+        text = json.loads(body)["inputText"]
+        with self._lock:
+            self.calls[text] = self.calls.get(text, 0) + 1
+            if self.calls[text] <= self.throttles:
+                raise ThrottlingException()
+        # A distinct vector per text, so the output order can be checked
+        embedding = [float(len(text)), float(sum(map(ord, text)))]
+        return {"body": io.BytesIO(json.dumps({"embedding": embedding}).encode())}
+
+
+def test_throttled_requests_are_retried_in_order():
+    client = FakeBedrockClient(throttles=1)
+    embeddings = ConcurrentEmbeddings(
+        BedrockEmbeddings(model_id=EMBEDDING_MODEL_ID, client=client),
+        max_workers=4,
+        batch_size=2,
+        base_delay=0.001,
+    )
+    texts = [f"chunk {i}" * (i + 1) for i in range(10)]
+
+    vectors = embeddings.embed_documents(texts)
+
+    assert vectors == [[float(len(text)), float(sum(map(ord, text)))] for text in texts]
+    assert all(client.calls[text] == 2 for text in texts)
+    assert embeddings.limiter.throttle_count == len(texts)
+    assert embeddings.limiter.in_flight == 0
+
+
+def test_throttle_halves_the_concurrency_limit():
+    limiter = AdaptiveConcurrency(max_limit=8)
+
+    limiter.acquire()
+    limiter.release(throttled=True)
+    assert limiter.limit == 4
+
+    limiter.acquire()
+    limiter.release(throttled=True)
+    assert limiter.limit == 2
+
+    limiter.acquire()
+    limiter.release()
+    assert 2 < limiter.limit < 3
@@ -0,0 +1,39 @@
+"""
+Quiz Shard Tests
+Checks how sharded quiz output is planned, capped and renumbered: python -m pytest -q
+"""
+
+from utils import _limit_questions, plan_quiz_shards, renumber_questions
+
+QUIZ = "".join(
+    f"Q{n}: Question {n}?\nA) one\nB) two\nC) three\nD) four\nAnswer: A\n\n" for n in range(1, 6)
+)
+
+
+def test_questions_beyond_the_limit_are_dropped_even_when_split_across_chunks():
+    # Cut the text every 7 characters, so headings such as "Q3:" are split
+    chunks = [QUIZ[i:i + 7] for i in range(0, len(QUIZ), 7)]
+
+    limited = "".join(_limit_questions(chunks, 2))
+
+    assert limited == QUIZ[:QUIZ.index("Q3:")].rstrip()
+    assert "Q3" not in limited
+
+
+def test_output_within_the_limit_is_passed_through():
+    chunks = [QUIZ[i:i + 7] for i in range(0, len(QUIZ), 7)]
+
+    assert "".join(_limit_questions(chunks, 5)) == QUIZ
+
+
+def test_questions_are_renumbered_from_the_shard_offset():
+    text, next_number = renumber_questions("\nQ1: First?\nAnswer: A\n\nQ2. Second?\nAnswer: B\n", 6)
+
+    assert text == "Q6: First?\nAnswer: A\n\nQ7. Second?\nAnswer: B"
+    assert next_number == 8
+
+
+def test_question_counts_are_split_into_shards():
+    assert plan_quiz_shards(12, 5) == [5, 5, 2]
+    assert plan_quiz_shards(3, 5) == [3]
+    assert plan_quiz_shards(0, 5) == [0]
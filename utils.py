@@ -1,20 +1,64 @@
+from __future__ import annotations
 
 import os
-from typing import Optional
+import re
+import time
+import hashlib
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, TYPE_CHECKING
 
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_aws import BedrockEmbeddings
-from langchain_community.vectorstores import FAISS
-from langchain_classic.chains.retrieval import create_retrieval_chain
-from langchain_classic.chains.combine_documents import create_stuff_documents_chain
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
+import numpy as np
+
+from answer_cache import SemanticAnswerCache
+from clustering import cluster_positions, rotate_representatives
+from sparse_index import SparseIndex, reciprocal_rank_fusion
+from quiz_parser import QuizParser
+from quiz_bank import QuizBank, QuizBankFiller, ALL_FILES
+from index_store import (
+    get_cache_dir,
+    cache_lock,
+    fingerprint_files,
+    new_manifest,
+    choose_index_factory,
+    ivf_pq_factory,
+    build_index,
+    is_lossless_index,
+    supports_removal,
+    delete_chunks,
+    save_full_vectors,
+    update_full_vectors,
+    load_full_vectors,
+    search_index,
+    benchmark_index_factories,
+    manifest_is_compatible,
+    diff_manifest,
+    mark_failed_files,
+    load_manifest,
+    save_manifest,
+    save_index,
+    load_index,
+    make_index_writable,
+    scan_catalog,
+    carry_over_entry,
+    map_file_positions,
+    search_positions,
+)
+
+# LangChain chains, loaders, splitters and Bedrock clients, and our modules
+# built on LangChain classes, are imported in the functions that use them,
+# so importing this module (and showing the app menu) stays fast
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import FAISS
+    from embedding_cache import CachedEmbeddings, QueryCacheEmbeddings
 
 # Multi-format document loader
 try:
     from multi_format_loader import (
-        load_all_documents_from_directory,
+        iter_documents,
+        print_document_summary,
+        find_supported_files,
         print_supported_formats,
         get_supported_formats,
     )
@@ -27,10 +71,57 @@ EMBEDDING_MODEL_ID = "amazon.titan-embed-text-v1"
 REGION_NAME = "us-east-1"
 CHUNK_SIZE = 1000
 CHUNK_OVERLAP = 200
+QA_CONTEXT_TOKENS = int(os.getenv("STUDY_BUDDY_CONTEXT_TOKENS", "1000"))  # Token budget for Q&A context
+INDEX_CACHE_DIR = os.getenv("STUDY_BUDDY_CACHE_DIR", ".study_buddy_cache")
+MMAP_INDEX = os.getenv("STUDY_BUDDY_MMAP_INDEX", "0" if os.name == "nt" else "1") != "0"  # Memory-map cached indexes (shared across sessions; off on Windows, which cannot replace mapped files)
+INDEX_FACTORY = os.getenv("STUDY_BUDDY_INDEX_FACTORY", "auto")  # FAISS index type, "auto" picks by size
+VECTOR_PRECISION = os.getenv("STUDY_BUDDY_VECTOR_PRECISION", "float32")  # float32, float16 or int8
+RERANK_SEARCH = os.getenv("STUDY_BUDDY_RERANK", "1") != "0"  # Exact re-ranking for compressed indexes
+IVF_RETRAIN_GROWTH = 2.0  # Retrain an IVF index updated in place once the corpus grows/shrinks by this factor
+EMBED_MAX_WORKERS = int(os.getenv("STUDY_BUDDY_EMBED_WORKERS", "8"))  # Concurrent Bedrock requests
+EMBED_BATCH_SIZE = 16     # Chunks per embedding request batch
+INDEX_BATCH_SIZE = 256    # Chunks embedded and added to FAISS per step
+STREAM_QUEUE_SIZE = 512   # Chunks buffered between the loading and embedding stages
+QUERY_CACHE_SIZE = int(os.getenv("STUDY_BUDDY_QUERY_CACHE_SIZE", "256"))    # Cached question embeddings
+QUERY_CACHE_TTL = float(os.getenv("STUDY_BUDDY_QUERY_CACHE_TTL", "3600"))   # Seconds
+ANSWER_CACHE_ENABLED = os.getenv("STUDY_BUDDY_ANSWER_CACHE", "0") == "1"  # Off by default: reused answers ignore wording differences
+ANSWER_CACHE_THRESHOLD = float(os.getenv("STUDY_BUDDY_ANSWER_CACHE_THRESHOLD", "0.95"))  # Cosine similarity
+QA_K = 4                  # Chunks retrieved per question
+HYBRID_SEARCH = os.getenv("STUDY_BUDDY_HYBRID_SEARCH", "1") != "0"  # BM25 + vector retrieval
+HYBRID_CANDIDATES = 20    # Candidates taken from each retriever before fusion
+QUIZ_CONTEXT_QUERY = "summary overview main topics"  # Fallback when vectors cannot be clustered
+QUIZ_CONTEXT_K = 8        # Context chunks per quiz (per shard for large quizzes)
+QUIZ_CLUSTERS = int(os.getenv("STUDY_BUDDY_QUIZ_CLUSTERS", "64"))  # Topic clusters per file / corpus
+QUIZ_CHUNKS_PER_CLUSTER = 4  # Small files get fewer, larger clusters
+QUIZ_SHARD_SIZE = int(os.getenv("STUDY_BUDDY_QUIZ_SHARD_SIZE", "5"))        # Questions per LLM call
+QUIZ_MAX_CONCURRENCY = int(os.getenv("STUDY_BUDDY_QUIZ_CONCURRENCY", "4"))  # Parallel quiz shards
+QUIZ_BANK_SIZE = int(os.getenv("STUDY_BUDDY_QUIZ_BANK_SIZE", "10"))  # Pre-generated questions per pool (0 disables)
+QUIZ_BANK_FILE_POOLS = int(os.getenv("STUDY_BUDDY_QUIZ_BANK_FILE_POOLS", "4"))  # Per-file pools kept filled, most recently quizzed
+QUIZ_BANK_FILE = "quiz_bank.json"
 
 # Global vectorstore cache
 _vectorstore = None
 _current_pdf = None
+_catalog = {}         # source_file -> catalog entry (type, pages, chunks, size, ingest time)
+_file_positions = {}  # source_file -> FAISS row positions of its chunks
+_index_version = 0    # Bumped whenever the active vectorstore changes
+_sparse_index = None  # BM25 keyword index of the active vectorstore
+_rerank_vectors = None  # Memory-mapped full-precision vectors of a compressed active index
+_adhoc_sparse = {}    # index version key -> BM25 index for other vectorstores
+
+# Question embedding and answer caches used by the Q&A chain
+_query_embeddings = None
+_answer_cache = None
+
+# Quiz context selection (see get_quiz_docs)
+_quiz_query_vector = None
+_quiz_clusters = {}   # (index version, source_file) -> clusters of FAISS row positions
+_quiz_rotation = {}   # (index version, source_file) -> next cluster slot
+_quiz_lock = threading.Lock()
+
+# Pre-generated quiz questions (see start_quiz_bank)
+_quiz_bank = None
+_quiz_bank_filler = None
 _files_directory = "files"
 
 
@@ -38,9 +129,9 @@ def load_all_pdfs_from_directory(directory: str, bedrock_client) -> Optional[FAI
     """Loads all supported documents from a directory and creates a single vector store.
     
     Now supports multiple formats: PDF, DOCX, TXT, MD, CSV, HTML, JSON, PPTX, XLSX
-    (depending on installed optional packages)
+    (depending on installed optional packages). A missing directory is
+    created and None returned.
     """
-    global _vectorstore, _current_pdf
     
     # Check if directory exists
     if not os.path.exists(directory):
@@ -48,123 +139,729 @@ def load_all_pdfs_from_directory(directory: str, bedrock_client) -> Optional[FAI
         os.makedirs(directory, exist_ok=True)
         return None
     
+    return ingest_documents([directory], bedrock_client)
+
+
+def ingest_documents(sources, bedrock_client) -> Optional[FAISS]:
+    """Load any mix of document files and directories into one cached vector store.
+    
+    Every way of loading documents goes through here, so each gets parallel
+    multi-format parsing, streamed splitting and embedding, the embedding
+    cache and a persisted index that is updated incrementally. The index is
+    cached per set of sources; directories are re-listed on every call, so
+    added, changed and removed files are picked up.
+    
+    Args:
+        sources: Path, or list of paths, of document files and/or directories
+        bedrock_client: Bedrock runtime client used for the embeddings
+    
+    Returns:
+        The (now active) vector store, or None if nothing could be loaded
+    """
+    sources = [sources] if isinstance(sources, str) else list(sources)
+    file_paths = _resolve_sources(sources)
+    if not file_paths:
+        return None
+    
+    embeddings = get_embeddings(bedrock_client)
+    
+    # Sessions sharing the cache load, update and save it one at a time
+    cache_dir = get_cache_dir(INDEX_CACHE_DIR, sources)
+    with cache_lock(cache_dir):
+        return _update_index(sources, file_paths, embeddings, cache_dir)
+
+
+def _update_index(sources: list, file_paths: list, embeddings: CachedEmbeddings, cache_dir: str) -> Optional[FAISS]:
+    """Bring the cached index in line with the source files and activate it."""
+    # Diff the source files against the persisted index
+    settings = _index_settings()
+    manifest = load_manifest(cache_dir)
+    
+    if manifest and not manifest_is_compatible(manifest, settings):
+        print("🔁 Index settings changed, rebuilding from scratch...")
+        manifest = None
+    
+    previous_files = manifest.get("files") if manifest else None
+    current_files = fingerprint_files(file_paths, previous_files)
+    
+    vectorstore = None
+    sparse_index = None
+    index_factory = "Flat"
+    files_to_load = sorted(current_files)
+    index_changed = False
+    kept_rows = None
+    trained_size = None
+    loaders = _available_loaders()
+    
+    if manifest and current_files:
+        try:
+            vectorstore = load_index(cache_dir, embeddings, mmap=MMAP_INDEX)
+        except Exception as e:
+            print(f"⚠️ Could not load cached index ({e}), rebuilding...")
+    
+    if vectorstore is not None:
+        index_factory = manifest.get("index_factory", "Flat")
+        trained_size = manifest.get("trained_size")
+        sparse_index = _load_sparse_index(cache_dir, vectorstore)
+        diff = diff_manifest(manifest, current_files, loaders)
+        stored_files = manifest["files"]
+        
+        for name in diff["unchanged"]:
+            carry_over_entry(current_files[name], stored_files[name])
+        
+        if not (diff["added"] or diff["changed"] or diff["removed"]):
+            print(f"⚡ Loaded cached index for {len(current_files)} file(s) from '{cache_dir}'")
+            print("✅ No changes detected, skipping re-embedding!\n")
+            
+            # Index type setting or thresholds changed since the index was
+            # saved (a type that could not be built is not retried)
+            requested_factory = _choose_index_factory(vectorstore)
+            if requested_factory != manifest.get("requested_factory", index_factory):
+                index_factory = _convert_index(vectorstore, requested_factory, cache_dir)
+                _save_cache(vectorstore, sparse_index, cache_dir,
+                            new_manifest(settings, current_files, index_factory, requested_factory,
+                                         vectorstore.index.ntotal))
+            
+            _activate_vectorstore(vectorstore, sources, current_files, sparse_index,
+                                  _load_rerank_vectors(vectorstore, cache_dir))
+            return vectorstore
+        
+        print(f"🔄 Updating cached index: {len(diff['added'])} added, "
+              f"{len(diff['changed'])} changed, {len(diff['removed'])} removed")
+        for label, names in (("+", diff["added"]), ("~", diff["changed"]), ("-", diff["removed"])):
+            for name in names:
+                print(f"   {label} {name}")
+        
+        # Drop vectors of files that changed or disappeared
+        stale_ids = [
+            chunk_id
+            for name in diff["changed"] + diff["removed"]
+            for chunk_id in stored_files[name]["chunk_ids"]
+        ]
+        if stale_ids and not supports_removal(vectorstore.index):
+            # Graph indexes cannot remove vectors: update as Flat, convert after
+            index_factory = _convert_index(vectorstore, "Flat", cache_dir)
+        else:
+            # Other indexes (including trained IVF-PQ / SQ ones) are updated
+            # in place; _optimize_index retrains once the corpus has grown
+            # enough to change the chosen index type
+            if MMAP_INDEX:
+                make_index_writable(vectorstore)
+            if not is_lossless_index(vectorstore.index):
+                kept_rows = np.ones(vectorstore.index.ntotal, dtype=bool)
+        
+        if stale_ids:
+            removed = delete_chunks(vectorstore, stale_ids)
+            if kept_rows is not None:
+                kept_rows = removed
+            sparse_index.remove(stale_ids)
+            index_changed = True
+            print(f"   🗑️  Removed {len(stale_ids)} stale chunk(s)")
+        
+        files_to_load = diff["added"] + diff["changed"]
+    
+    file_stream = None
+    if sparse_index is None:
+        sparse_index = SparseIndex()
+    
     # Use multi-format loader if available, otherwise fallback to PDF-only
-    if MULTI_FORMAT_AVAILABLE:
+    if vectorstore is not None and not files_to_load:
+        pass  # Only removals, nothing new to embed
+    elif MULTI_FORMAT_AVAILABLE:
         print("🎨 Multi-format document support enabled!")
-        all_docs = load_all_documents_from_directory(directory)
+        if vectorstore is None:
+            print_document_summary(file_paths, _describe_sources(sources))
+            file_stream = iter_documents(file_paths)
+        else:
+            file_stream = iter_documents([current_files[name]["path"] for name in files_to_load])
     else:
-        # Fallback to PDF-only loading
-        pdf_files = [f for f in os.listdir(directory) if f.endswith('.pdf')]
+        # Fallback to PDF-only loading (only PDFs were resolved)
+        print(f"📚 Found {len(files_to_load)} PDF file(s) to process in {_describe_sources(sources)}:")
+        for pdf in files_to_load:
+            print(f"   • {pdf}")
         
-        if not pdf_files:
-            print(f"⚠️ No PDF files found in '{directory}/' directory")
-            print(f"💡 Please add PDF files to the '{directory}/' folder and restart")
-            return None
+        print(f"\n🔄 Loading and processing PDFs...")
+        file_stream = _iter_pdf_files([current_files[name]["path"] for name in files_to_load])
+    
+    if file_stream is not None:
+        from embedding_pipeline import prefetch
         
-        print(f"📚 Found {len(pdf_files)} PDF file(s) in '{directory}/':")
-        for pdf in pdf_files:
-            print(f"   • {pdf}")
+        # Parsing, splitting and embedding overlap: each file is split and
+        # queued for embedding as soon as it is loaded
+        stats = {"sections": 0, "chunks": 0}
+        embeddings.reset_stats()
+        chunks = prefetch(_iter_chunks(file_stream, current_files, stats, sparse_index), STREAM_QUEUE_SIZE)
+        vectorstore = index_documents(chunks, embeddings, vectorstore=vectorstore)
         
-        print(f"\n🔄 Loading and processing all PDFs...")
+        if vectorstore is None:
+            print("❌ No documents loaded successfully")
+            return None
         
-        all_docs = []
+        print(f"\n✂️  Split {stats['sections']} document section(s) into {stats['chunks']} text chunks")
+        print("🧠 Embeddings generated (only for new or changed files)")
+        print_embedding_cache_stats(embeddings)
+        print("✅ All documents processed and indexed!\n")
+        index_changed = index_changed or stats["chunks"] > 0
         
-        # Load each PDF
-        for pdf_file in pdf_files:
-            file_path = os.path.join(directory, pdf_file)
-            print(f"\n📄 Processing: {pdf_file}")
-            
-            try:
-                loader = PyPDFLoader(file_path)
-                docs = loader.load()
-                
-                # Add source metadata
-                for doc in docs:
-                    doc.metadata["source_file"] = pdf_file
-                
-                all_docs.extend(docs)
-                print(f"   ✓ Loaded {len(docs)} pages")
-            except Exception as e:
-                print(f"   ✗ Error loading {pdf_file}: {e}")
-                continue
+        # Files that produced no chunks are not retried until they change
+        mark_failed_files(current_files, files_to_load, loaders)
+    
+    if kept_rows is not None and index_changed:
+        _update_full_vectors(vectorstore, cache_dir, kept_rows)
+    
+    stored_factory = manifest.get("index_factory") if manifest else None
+    updated_factory = _optimize_index(vectorstore, index_factory, cache_dir, trained_size)
+    if updated_factory != index_factory or trained_size is None:
+        trained_size = vectorstore.index.ntotal
+    index_factory = updated_factory
+    updated_manifest = new_manifest(settings, current_files, index_factory, _choose_index_factory(vectorstore),
+                                    trained_size)
+    
+    # Persist so the next launch can skip re-embedding; when no chunks were
+    # added or removed, the index files on disk are still current
+    if manifest is None or index_changed or index_factory != stored_factory:
+        _save_cache(vectorstore, sparse_index, cache_dir, updated_manifest)
+    elif updated_manifest != manifest:
+        save_manifest(cache_dir, updated_manifest)
+    
+    # Cache the vectorstore
+    _activate_vectorstore(vectorstore, sources, current_files, sparse_index,
+                          _load_rerank_vectors(vectorstore, cache_dir))
+    
+    return vectorstore
+
+
+def _save_cache(vectorstore: FAISS, sparse_index: SparseIndex, cache_dir: str, manifest: dict):
+    """Persist the vectorstore, keyword index and manifest to the cache folder."""
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        sparse_index.save(cache_dir)
+        save_index(vectorstore, cache_dir, manifest, mmap=MMAP_INDEX)
+        print(f"💾 Index cached in '{cache_dir}'\n")
+    except Exception as e:
+        print(f"⚠️ Could not save index cache: {e}\n")
+
+
+def _choose_index_factory(vectorstore: FAISS) -> str:
+    """FAISS index type for the vectorstore's size (or the configured override)."""
+    return choose_index_factory(vectorstore.index.ntotal, vectorstore.index.d, INDEX_FACTORY, VECTOR_PRECISION)
+
+
+def _full_vectors(vectorstore: FAISS, cache_dir: Optional[str] = None) -> np.ndarray:
+    """All stored vectors at full precision, in index order."""
+    if is_lossless_index(vectorstore.index):
+        return vectorstore.index.reconstruct_n(0, vectorstore.index.ntotal)
+    
+    if cache_dir is not None:
+        stored = load_full_vectors(cache_dir, vectorstore.index.ntotal, vectorstore.index.d)
+        if stored is not None:
+            return np.array(stored)
+    
+    # Compressed index without its vectors file: fetch the exact vectors
+    # again (hits the embedding cache)
+    texts = [
+        vectorstore.docstore.search(vectorstore.index_to_docstore_id[i]).page_content
+        for i in range(vectorstore.index.ntotal)
+    ]
+    return np.asarray(vectorstore.embeddings.embed_documents(texts), dtype=np.float32)
+
+
+def _convert_index(vectorstore: FAISS, factory: str, cache_dir: Optional[str] = None) -> str:
+    """Rebuild the vectorstore's FAISS index as the given type; positions are kept.
+    
+    With a cache_dir, a compressed index gets its full-precision vectors
+    written next to it for exact re-ranking and later rebuilds.
+    """
+    start = time.perf_counter()
+    vectors = _full_vectors(vectorstore, cache_dir)
+    try:
+        vectorstore.index = build_index(vectors, factory)
+    except RuntimeError as e:
+        # e.g. too few vectors to train an IVF-PQ override
+        print(f"⚠️ Could not build {factory} index ({str(e).split('Error: ')[-1]}), using Flat")
+        factory = "Flat"
+        vectorstore.index = build_index(vectors, factory)
+    print(f"🧭 Built {factory} index over {vectorstore.index.ntotal} vectors in {time.perf_counter() - start:.1f}s")
+    
+    if cache_dir is not None and not is_lossless_index(vectorstore.index):
+        os.makedirs(cache_dir, exist_ok=True)
+        save_full_vectors(cache_dir, vectors)
+    
+    return factory
+
+
+def _update_full_vectors(vectorstore: FAISS, cache_dir: str, kept_rows: np.ndarray):
+    """Update the full-precision vectors file of a compressed index updated in place.
+    
+    Only the vectors of the newly added chunks are fetched (from the
+    embedding cache); the kept rows are copied over from the old file.
+    """
+    first_new = int(kept_rows.sum())
+    texts = [
+        vectorstore.docstore.search(vectorstore.index_to_docstore_id[i]).page_content
+        for i in range(first_new, vectorstore.index.ntotal)
+    ]
+    new_vectors = np.asarray(vectorstore.embeddings.embed_documents(texts), dtype=np.float32)
+    new_vectors = new_vectors.reshape(len(texts), vectorstore.index.d)
     
-    if not all_docs:
-        print("❌ No documents loaded successfully")
+    os.makedirs(cache_dir, exist_ok=True)
+    if not update_full_vectors(cache_dir, kept_rows, new_vectors, vectorstore.index.d):
+        save_full_vectors(cache_dir, _full_vectors(vectorstore))
+
+
+def _optimize_index(vectorstore: FAISS, current_factory: str = "Flat", cache_dir: Optional[str] = None,
+                    trained_size: Optional[int] = None) -> str:
+    """Switch the index to the type chosen for its size, if it is not already.
+    
+    The IVF-PQ factory string encodes a number of lists that follows the
+    corpus size. An IVF index updated in place (trained on `trained_size`
+    vectors) is kept until the corpus has grown or shrunk by
+    IVF_RETRAIN_GROWTH, instead of being retrained for every small change.
+    """
+    factory = _choose_index_factory(vectorstore)
+    if factory == current_factory:
+        return current_factory
+    
+    if trained_size and current_factory.startswith("IVF") and factory.startswith("IVF"):
+        growth = vectorstore.index.ntotal / trained_size
+        if 1 / IVF_RETRAIN_GROWTH < growth < IVF_RETRAIN_GROWTH:
+            return current_factory
+    
+    return _convert_index(vectorstore, factory, cache_dir)
+
+
+def _load_rerank_vectors(vectorstore: FAISS, cache_dir: str) -> Optional[np.ndarray]:
+    """Load (memory-map with MMAP_INDEX) the full-precision vectors used to re-rank a compressed index."""
+    if not RERANK_SEARCH or is_lossless_index(vectorstore.index):
         return None
+    return load_full_vectors(cache_dir, vectorstore.index.ntotal, vectorstore.index.d, mmap=MMAP_INDEX)
+
+
+def _get_rerank_vectors(vectorstore: FAISS) -> Optional[np.ndarray]:
+    """Full-precision vectors for re-ranking searches on a vectorstore, if available."""
+    return _rerank_vectors if vectorstore is _vectorstore else None
+
+
+def run_index_benchmark(vectorstore: FAISS) -> list:
+    """Benchmark Flat, scalar-quantized, HNSW and IVF-PQ search on the vectorstore's own vectors."""
+    vectors = _full_vectors(vectorstore)
+    factories = ["Flat", "SQfp16", "SQ8", "HNSW32", "HNSW32,SQ8"]
+    if len(vectors) >= 1000:
+        factories.append(ivf_pq_factory(len(vectors), vectors.shape[1]))
+    
+    print(f"⏱️  Benchmarking {', '.join(factories)} on {len(vectors)} vectors...")
+    results = benchmark_index_factories(vectors, factories)
+    
+    print(f"\n   {'Index':<16} {'Build':>8} {'Query':>9} {'Recall@4':>9} {'Size':>9}")
+    for result in results:
+        if "error" in result:
+            print(f"   {result['factory']:<16} ❌ {result['error']}")
+            continue
+        print(f"   {result['factory']:<16} {result['build_s']:>7.2f}s {result['query_ms']:>7.3f}ms "
+              f"{result['recall']:>9.1%} {result['size_mb']:>7.1f}MB")
+    print(f"\n   Current choice for this corpus: {_choose_index_factory(vectorstore)}\n")
+    
+    return results
+
+
+def _activate_vectorstore(vectorstore: FAISS, source: list, catalog: Optional[dict] = None,
+                          sparse_index: Optional[SparseIndex] = None, rerank_vectors: Optional[np.ndarray] = None):
+    """Make a vectorstore the cached active one, along with its file catalog and search helpers."""
+    global _vectorstore, _current_pdf, _catalog, _file_positions, _index_version, _sparse_index, _rerank_vectors
+    
+    if catalog is None:
+        catalog = scan_catalog(vectorstore)
+    
+    _index_version += 1
+    _quiz_clusters.clear()
+    _quiz_rotation.clear()
+    
+    _vectorstore = vectorstore
+    _current_pdf = source
+    _sparse_index = sparse_index
+    _rerank_vectors = rerank_vectors
+    # Files that produced no chunks stay in the manifest but are not listed
+    _catalog = {name: entry for name, entry in catalog.items() if entry.get("chunk_ids")}
+    _file_positions = map_file_positions(vectorstore, catalog)
+
+
+def get_file_catalog(vectorstore) -> dict:
+    """Return the file catalog (file name -> type, pages, chunks, size, ingest time)."""
+    if vectorstore is _vectorstore:
+        return _catalog
+    # Vectorstore built outside the loaders: derive the catalog from its docstore
+    return scan_catalog(vectorstore)
+
+
+def describe_file(entry: dict) -> str:
+    """Format a catalog entry as a short summary, e.g. "PDF, 47 pages, 61 chunks, 1.2 MB"."""
+    file_type = (entry.get("file_type") or "").lower()
+    unit = {"pdf": "page", "csv": "row"}.get(file_type, "section")
+    pages = entry.get("pages")
+    chunks = len(entry.get("chunk_ids", []))
+    
+    parts = [file_type.upper() or "FILE"]
+    if pages:
+        parts.append(f"{pages} {unit}{'s' if pages != 1 else ''}")
+    parts.append(f"{chunks} chunk{'s' if chunks != 1 else ''}")
+    
+    size = entry.get("size")
+    if size is not None:
+        for size_unit in ("B", "KB", "MB", "GB"):
+            if size < 1024 or size_unit == "GB":
+                parts.append(f"{size:.0f} {size_unit}" if size_unit == "B" else f"{size:.1f} {size_unit}")
+                break
+            size /= 1024
+    
+    return ", ".join(parts)
+
+
+def _load_sparse_index(cache_dir: str, vectorstore: FAISS) -> SparseIndex:
+    """Load the persisted keyword index, rebuilding it if missing or out of sync."""
+    try:
+        sparse_index = SparseIndex.load(cache_dir)
+        if sparse_index.live_ids() == set(vectorstore.index_to_docstore_id.values()):
+            return sparse_index
+    except (OSError, ValueError, KeyError):
+        pass
+    
+    print("🔤 Building keyword index from the cached chunks...")
+    sparse_index = SparseIndex.from_vectorstore(vectorstore)
+    try:
+        sparse_index.save(cache_dir)
+    except OSError as e:
+        print(f"⚠️ Could not save keyword index: {e}")
+    return sparse_index
+
+
+def _get_sparse_index(vectorstore: FAISS) -> SparseIndex:
+    """Return the BM25 keyword index for a vectorstore, building it on first use."""
+    global _sparse_index
     
-    print(f"\n📊 Total document sections loaded: {len(all_docs)}")
+    if vectorstore is _vectorstore:
+        if _sparse_index is None:
+            _sparse_index = SparseIndex.from_vectorstore(vectorstore)
+        return _sparse_index
+    
+    key = _index_version_key(vectorstore)
+    if key not in _adhoc_sparse:
+        _adhoc_sparse.clear()
+        _adhoc_sparse[key] = SparseIndex.from_vectorstore(vectorstore)
+    return _adhoc_sparse[key]
+
+
+def _get_file_positions(vectorstore: FAISS) -> dict:
+    """Return the source_file -> index positions map for a vectorstore."""
+    if vectorstore is _vectorstore:
+        return _file_positions
+    return map_file_positions(vectorstore, scan_catalog(vectorstore))
+
+
+def _iter_pdf_files(file_paths: list):
+    """Yield (file name, pages) for each PDF, used when multi-format support is unavailable."""
+    # Load each PDF
+    for file_path in file_paths:
+        pdf_file = os.path.basename(file_path)
+        print(f"\n📄 Processing: {pdf_file}")
+        
+        try:
+            from langchain_community.document_loaders import PyPDFLoader
+            loader = PyPDFLoader(file_path)
+            docs = loader.load()
+            
+            # Add source metadata
+            for doc in docs:
+                doc.metadata["source_file"] = pdf_file
+            
+            print(f"   ✓ Loaded {len(docs)} pages")
+            yield pdf_file, docs
+        except Exception as e:
+            print(f"   ✗ Error loading {pdf_file}: {e}")
+            continue
+
+
+def _iter_chunks(file_stream, current_files: dict, stats: dict, sparse_index: Optional[SparseIndex] = None):
+    """Split each loaded file into chunks as it arrives, assigning chunk ids.
+    
+    Chunk ids are recorded per file in the manifest entries, and each chunk
+    is added to the keyword index when one is given. Chunks are stamped with
+    the position of their parent document in the file ('section'), so chunks
+    of different pages or rows are never merged as one text.
+    """
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
     
-    # Split text
-    print("✂️  Splitting text into chunks...")
     text_splitter = RecursiveCharacterTextSplitter(
         chunk_size=CHUNK_SIZE,
-        chunk_overlap=CHUNK_OVERLAP
+        chunk_overlap=CHUNK_OVERLAP,
+        add_start_index=True
     )
-    splits = text_splitter.split_documents(all_docs)
-    print(f"   ✓ Created {len(splits)} text chunks")
     
-    # Create embeddings
-    print("🧠 Generating embeddings (this may take a moment)...")
-    embeddings = BedrockEmbeddings(
+    for _, docs in file_stream:
+        stats["sections"] += len(docs)
+        
+        # Record catalog info for the file
+        name = docs[0].metadata.get("source_file") if docs else None
+        entry = current_files.get(name)
+        if entry is not None:
+            entry["file_type"] = docs[0].metadata.get("file_type", os.path.splitext(name)[1].lower().lstrip('.'))
+            entry["pages"] = len(docs)
+            entry["ingested_at"] = time.time()
+        
+        for section, doc in enumerate(docs):
+            doc.metadata["section"] = section
+        
+        for split in text_splitter.split_documents(docs):
+            split.id = str(uuid.uuid4())
+            if entry is not None:
+                entry["chunk_ids"].append(split.id)
+            if sparse_index is not None:
+                sparse_index.add(split.id, split.page_content)
+            stats["chunks"] += 1
+            yield split
+
+
+def get_embeddings(bedrock_client) -> CachedEmbeddings:
+    """Create Titan embeddings backed by the shared on-disk embedding cache.
+    
+    Cache misses are embedded concurrently with adaptive rate limiting.
+    """
+    from langchain_aws import BedrockEmbeddings
+    from embedding_cache import CachedEmbeddings
+    from embedding_pipeline import ConcurrentEmbeddings
+    
+    bedrock_embeddings = BedrockEmbeddings(
         model_id=EMBEDDING_MODEL_ID,
         client=bedrock_client
     )
+    return CachedEmbeddings(
+        ConcurrentEmbeddings(
+            bedrock_embeddings,
+            max_workers=EMBED_MAX_WORKERS,
+            batch_size=EMBED_BATCH_SIZE,
+        ),
+        model_id=EMBEDDING_MODEL_ID,
+        db_path=os.path.join(INDEX_CACHE_DIR, "embeddings.sqlite"),
+    )
+
+
+def print_embedding_cache_stats(embeddings):
+    """Print how many chunk embeddings were served from the cache."""
+    from embedding_cache import CachedEmbeddings
     
-    vectorstore = FAISS.from_documents(splits, embeddings)
-    print("✅ All documents processed and indexed!\n")
+    if isinstance(embeddings, CachedEmbeddings):
+        print(f"   ⚡ Embedding cache: {embeddings.hits} hit(s), {embeddings.misses} new")
+        
+        limiter = getattr(embeddings.embeddings, "limiter", None)
+        if limiter is not None and limiter.throttle_count:
+            print(f"   🐢 Throttled {limiter.throttle_count} time(s), "
+                  f"concurrency now {int(limiter.limit)}/{limiter.max_limit}")
+
+
+def _embed_batches(documents, embeddings):
+    """Group documents into batches and embed each batch in one call."""
+    batch = []
+    for doc in documents:
+        batch.append(doc)
+        if len(batch) == INDEX_BATCH_SIZE:
+            yield batch, embeddings.embed_documents([d.page_content for d in batch])
+            batch = []
+    if batch:
+        yield batch, embeddings.embed_documents([d.page_content for d in batch])
+
+
+def index_documents(documents, embeddings, vectorstore: Optional[FAISS] = None) -> Optional[FAISS]:
+    """Embed documents in batches and add them to a (new or existing) FAISS index.
     
-    # Cache the vectorstore
-    _vectorstore = vectorstore
-    _current_pdf = directory
+    Accepts any iterable (including a lazy stream) of documents. Each batch
+    is embedded in one call, so the concurrent embedder can fan it out, and
+    the next batch is embedded in the background while the current one is
+    added to FAISS via add_embeddings. Document ids are kept when set.
+    
+    Returns None if there was nothing to index and no existing vectorstore.
+    """
+    from langchain_community.vectorstores import FAISS
+    from compact_docstore import CompactDocstore
+    from embedding_pipeline import prefetch
+    
+    for batch, vectors in prefetch(_embed_batches(documents, embeddings), maxsize=1):
+        texts = [doc.page_content for doc in batch]
+        metadatas = [doc.metadata for doc in batch]
+        ids = [doc.id or str(uuid.uuid4()) for doc in batch]
+        
+        if vectorstore is None:
+            vectorstore = FAISS.from_embeddings(
+                list(zip(texts, vectors)), embeddings, metadatas=metadatas, ids=ids,
+                docstore=CompactDocstore()
+            )
+        else:
+            vectorstore.add_embeddings(list(zip(texts, vectors)), metadatas=metadatas, ids=ids)
     
     return vectorstore
 
 
-def load_and_process_pdf(file_path: str, bedrock_client) -> Optional[FAISS]:
-    """Loads PDF, splits text, and creates vector store."""
-    global _vectorstore, _current_pdf
+def _index_settings() -> dict:
+    """Settings that invalidate a persisted index when changed."""
+    return {
+        "embedding_model_id": EMBEDDING_MODEL_ID,
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+    }
+
+
+def _available_loaders() -> list:
+    """File formats the active loader can parse, recorded with files that produced no chunks."""
+    if MULTI_FORMAT_AVAILABLE:
+        return sorted(get_supported_formats())
+    return ['pdf']
+
+
+def _list_source_files(directory: str) -> list:
+    """List the files in a directory that the active loader would ingest."""
+    if MULTI_FORMAT_AVAILABLE:
+        return [str(path) for path in find_supported_files(directory)]
+    
+    return sorted(
+        os.path.join(directory, f) for f in os.listdir(directory) if f.endswith('.pdf')
+    )
+
+
+def _is_supported_file(file_path: str) -> bool:
+    """Whether the active loader can ingest a file."""
+    ext = os.path.splitext(file_path)[1].lower().lstrip('.')
+    if MULTI_FORMAT_AVAILABLE:
+        return ext in get_supported_formats()
+    return ext == 'pdf'
+
+
+def _resolve_sources(sources: list) -> list:
+    """Expand files and directories into the document files to ingest.
+    
+    Missing paths and unsupported files are reported and skipped. Files are
+    identified by name in the index catalog, so when two sources contain
+    files with the same name only the first is used.
+    """
+    file_paths = []
+    names = {}
     
-    # Return cached vectorstore if same PDF
-    if _current_pdf == file_path and _vectorstore is not None:
-        return _vectorstore
+    for source in sources:
+        if os.path.isdir(source):
+            found = _list_source_files(source)
+            if not found:
+                print(f"⚠️ No supported documents found in '{source}'")
+        elif os.path.isfile(source):
+            if _is_supported_file(source):
+                found = [source]
+            else:
+                print(f"⚠️ Unsupported file format: {source}")
+                found = []
+        else:
+            print(f"⚠️ Not found: {source}")
+            found = []
+        
+        for file_path in found:
+            path = os.path.abspath(file_path)
+            name = os.path.basename(path)
+            if name in names:
+                if names[name] != path:
+                    print(f"⚠️ Skipping {path}: a file named '{name}' is already included")
+                continue
+            names[name] = path
+            file_paths.append(path)
     
+    if not file_paths and MULTI_FORMAT_AVAILABLE:
+        print(f"💡 Supported formats: {', '.join(sorted(get_supported_formats()))}")
+    
+    return file_paths
+
+
+def _describe_sources(sources: list) -> str:
+    """Short description of the sources for progress messages."""
+    if len(sources) == 1:
+        return f"'{sources[0]}/'" if os.path.isdir(sources[0]) else f"'{sources[0]}'"
+    return f"{len(sources)} locations"
+
+
+def load_and_process_pdf(file_path: str, bedrock_client) -> Optional[FAISS]:
+    """Loads a single document (PDF or any other supported format) into a cached vector store."""
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"File '{file_path}' not found.")
+    
+    return ingest_documents([file_path], bedrock_client)
+
 
-    print(f"📄 Loading and processing: {file_path}...")
+def _get_query_embeddings(vectorstore) -> QueryCacheEmbeddings:
+    """Return the shared question-embedding LRU for a vectorstore's embeddings."""
+    global _query_embeddings
+    from embedding_cache import QueryCacheEmbeddings
     
-    # 1. Load PDF
-    loader = PyPDFLoader(file_path)
-    docs = loader.load()
-    print(f"   - Loaded {len(docs)} pages.")
+    if _query_embeddings is None or _query_embeddings.embeddings is not vectorstore.embeddings:
+        _query_embeddings = QueryCacheEmbeddings(
+            vectorstore.embeddings,
+            max_size=QUERY_CACHE_SIZE,
+            ttl=QUERY_CACHE_TTL,
+        )
+    return _query_embeddings
 
-    # 2. Split Text
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=CHUNK_SIZE,
-        chunk_overlap=CHUNK_OVERLAP
-    )
-    splits = text_splitter.split_documents(docs)
-    print(f"   - Split into {len(splits)} text chunks.")
 
-    # 3. Embeddings & Vector Store
-    print("   - Generating embeddings...")
-    embeddings = BedrockEmbeddings(
-        model_id=EMBEDDING_MODEL_ID,
-        client=bedrock_client
-    )
+def get_cache_stats() -> dict:
+    """Return hit/miss counters of the runtime caches."""
+    stats = {}
+    if _query_embeddings is not None:
+        stats["Question embeddings"] = _query_embeddings.stats()
+    if _answer_cache is not None:
+        stats["Answers"] = _answer_cache.stats()
+    if _quiz_bank is not None:
+        stats["Quiz bank"] = _quiz_bank.stats()
+    return stats
+
+
+def _get_answer_cache() -> SemanticAnswerCache:
+    """Return the shared semantic answer cache."""
+    global _answer_cache
     
-    vectorstore = FAISS.from_documents(splits, embeddings)
-    print("✅ Processing complete!")
+    if _answer_cache is None:
+        _answer_cache = SemanticAnswerCache(threshold=ANSWER_CACHE_THRESHOLD)
+    return _answer_cache
+
+
+def hybrid_search(vectorstore, query: str, embedding: list, k: int = QA_K) -> list:
+    """Retrieve k chunks for a question, fusing vector and BM25 keyword results.
     
-    # Cache the vectorstore
-    _vectorstore = vectorstore
-    _current_pdf = file_path
+    Both retrievers return HYBRID_CANDIDATES candidates, which are combined
+    with reciprocal-rank fusion; chunks matching exact terms (formulas, star
+    names) can then outrank semantically close but unrelated chunks without
+    raising k. With HYBRID_SEARCH disabled this is a plain vector search.
+    """
+    rerank_vectors = _get_rerank_vectors(vectorstore)
+    if not HYBRID_SEARCH:
+        return search_index(vectorstore, embedding, k, rerank_vectors)
     
-    return vectorstore
+    dense = search_index(vectorstore, embedding, max(k, HYBRID_CANDIDATES), rerank_vectors)
+    sparse = _get_sparse_index(vectorstore).search(query, max(k, HYBRID_CANDIDATES))
+    
+    docs = {doc.id: doc for doc in dense}
+    fused = reciprocal_rank_fusion([[doc.id for doc in dense], [chunk_id for chunk_id, _ in sparse]])
+    
+    results = []
+    for chunk_id in fused[:k]:
+        doc = docs.get(chunk_id) or vectorstore.docstore.search(chunk_id)
+        if hasattr(doc, "page_content"):
+            results.append(doc)
+    return results
 
 
-def build_qa_chain(llm, vectorstore):
-    """Builds a RAG chain for question answering with source citations."""
+def build_qa_chain(llm, vectorstore, use_answer_cache: bool = ANSWER_CACHE_ENABLED):
+    """Builds a RAG chain for question answering with source citations.
+    
+    With use_answer_cache, a paraphrase of an earlier question that
+    retrieves the same chunks is answered from the semantic answer cache
+    instead of calling the LLM again; such outputs carry "cached_answer": True.
+    """
+    from langchain_classic.chains.retrieval import create_retrieval_chain
+    from langchain_classic.chains.combine_documents import create_stuff_documents_chain
+    from langchain_core.prompts import ChatPromptTemplate, PromptTemplate
+    from langchain_core.runnables import RunnableLambda, RunnablePassthrough, RunnableGenerator
+    from context_packer import pack_documents
     
     qa_prompt = ChatPromptTemplate.from_template("""
     You are a helpful study assistant. Use the following pieces of context to answer the question at the end.
@@ -191,15 +888,59 @@ def build_qa_chain(llm, vectorstore):
     
     Answer:""")
 
-    document_chain = create_stuff_documents_chain(llm, qa_prompt)
-    retriever = vectorstore.as_retriever(search_kwargs={"k": 4})
-    retrieval_chain = create_retrieval_chain(retriever, document_chain)
+    # Merge overlapping chunks and trim to the token budget before stuffing,
+    # labelling each section so the model can cite it
+    document_chain = RunnableLambda(
+        lambda inputs: {**inputs, "context": pack_documents(inputs["context"], QA_CONTEXT_TOKENS)}
+    ) | create_stuff_documents_chain(
+        llm,
+        qa_prompt,
+        document_prompt=PromptTemplate.from_template("Source: {citation}\n{page_content}"),
+    )
+    
+    # Retrieve with cached question embeddings so repeated questions skip Titan
+    query_embeddings = _get_query_embeddings(vectorstore)
+    retriever = RunnableLambda(
+        lambda inputs: hybrid_search(vectorstore, inputs["input"], query_embeddings.embed_query(inputs["input"]))
+    )
+    
+    if not use_answer_cache:
+        return create_retrieval_chain(retriever, document_chain)
+    
+    answer_cache = _get_answer_cache()
+    generate = RunnablePassthrough.assign(answer=document_chain)
+    
+    def answer(inputs):
+        vector = query_embeddings.get_cached(inputs["input"]) or query_embeddings.embed_query(inputs["input"])
+        chunk_ids = [doc.id for doc in inputs["context"]]
+        version = _index_version_key(vectorstore)
+        
+        cached = answer_cache.lookup(vector, chunk_ids, version)
+        if cached is not None:
+            return RunnableLambda(lambda x: {**x, "answer": cached, "cached_answer": True})
+        
+        # Pass the (possibly streamed) answer through and store it once complete
+        def store(chunks):
+            text = ""
+            for chunk in chunks:
+                text += chunk.get("answer", "")
+                yield chunk
+            answer_cache.add(vector, chunk_ids, text, version)
+        
+        return generate | RunnableGenerator(store)
+    
+    retrieval_chain = RunnablePassthrough.assign(context=retriever) | RunnableLambda(answer)
     
     return retrieval_chain
 
 
-def build_quiz_chain(llm, vectorstore, num_questions: int = 5):
-    """Builds a chain for generating multiple-choice questions."""
+def build_quiz_chain(llm, vectorstore, num_questions: int = 5, structured: bool = False):
+    """Builds a chain for generating multiple-choice questions.
+    
+    With structured=True the chain returns a list of Question objects
+    (streamed one question at a time) instead of quiz text.
+    """
+    from langchain_core.prompts import ChatPromptTemplate
     
     quiz_prompt = ChatPromptTemplate.from_template("""
     You are a test generator. Based on the following content, create {num_questions} multiple-choice questions.
@@ -226,45 +967,111 @@ def build_quiz_chain(llm, vectorstore, num_questions: int = 5):
     
     Generate {num_questions} multiple-choice questions:""")
 
-    # Get relevant documents
-    retriever = vectorstore.as_retriever(search_kwargs={"k": 8})
-    
-    # Build chain that properly handles the input
-    def format_docs(docs):
-        return "\n\n".join(doc.page_content for doc in docs)
-    
-    chain = (
-        {
-            "context": lambda x: format_docs(retriever.invoke("summary overview main topics")), 
-            "num_questions": lambda x: x
-        }
-        | quiz_prompt
-        | llm
-        | StrOutputParser()
-    )
+    return _build_sharded_quiz_chain(llm, quiz_prompt, vectorstore, structured=structured)
+
+
+def _index_version_key(vectorstore) -> tuple:
+    """Identify the current contents of a vectorstore for cache invalidation."""
+    if vectorstore is _vectorstore:
+        return ("active", _index_version)
+    return ("adhoc", id(vectorstore), vectorstore.index.ntotal)
+
+
+def _get_quiz_clusters(vectorstore, source_file: Optional[str] = None) -> Optional[list]:
+    """Cluster the stored vectors of a file (or the corpus), memoised until the index changes."""
+    key = (_index_version_key(vectorstore), source_file)
+    
+    with _quiz_lock:
+        if key in _quiz_clusters:
+            return _quiz_clusters[key]
+    
+    # Clustered without the lock, so other quizzes are not held up by k-means
+    if source_file is None:
+        positions = np.arange(vectorstore.index.ntotal, dtype=np.int64)
+    else:
+        positions = _get_file_positions(vectorstore).get(source_file, [])
+    
+    num_clusters = min(QUIZ_CLUSTERS, max(1, len(positions) // QUIZ_CHUNKS_PER_CLUSTER))
+    try:
+        clusters = cluster_positions(vectorstore.index, positions, num_clusters)
+    except RuntimeError:
+        # Index type cannot reconstruct vectors; fall back to the fixed query
+        clusters = None
     
-    return chain
+    with _quiz_lock:
+        return _quiz_clusters.setdefault(key, clusters)
+
+
+def next_quiz_rotation(vectorstore, source_file: Optional[str] = None, shards: int = 1) -> int:
+    """Reserve the next cluster slots for a quiz, so each quiz covers different topics."""
+    key = (_index_version_key(vectorstore), source_file)
+    
+    with _quiz_lock:
+        start = _quiz_rotation.get(key, 0)
+        _quiz_rotation[key] = start + QUIZ_CONTEXT_K * shards
+        return start
+
+
+def get_quiz_docs(vectorstore, source_file: Optional[str] = None, shard: int = 0, shards: int = 1,
+                  rotation: int = 0) -> list:
+    """Get the quiz context chunks for the whole corpus or one file.
+    
+    The stored vectors are k-means clustered (once per index version) and
+    one representative chunk is taken from each of QUIZ_CONTEXT_K clusters,
+    starting at cluster slot `rotation` (see next_quiz_rotation). Successive
+    quizzes therefore walk through every topic of a file instead of reusing
+    the same top matches, without any embedding calls. For a sharded quiz,
+    the chunks for all shards are dealt out round-robin.
+    """
+    global _quiz_query_vector
+    
+    k = QUIZ_CONTEXT_K * shards
+    clusters = _get_quiz_clusters(vectorstore, source_file)
+    
+    if clusters is not None:
+        positions = rotate_representatives(clusters, rotation, k)
+        docs = [vectorstore.docstore.search(vectorstore.index_to_docstore_id[p]) for p in positions]
+    else:
+        if _quiz_query_vector is None:
+            _quiz_query_vector = vectorstore.embeddings.embed_query(QUIZ_CONTEXT_QUERY)
+        
+        if source_file is None:
+            docs = search_index(vectorstore, _quiz_query_vector, k, _get_rerank_vectors(vectorstore))
+        else:
+            # Only search the chunks of the specific file
+            positions = _get_file_positions(vectorstore).get(source_file, [])
+            docs = search_positions(vectorstore, _quiz_query_vector, positions, k=k,
+                                    full_vectors=_get_rerank_vectors(vectorstore))
+    
+    # Small files may not have enough chunks for disjoint slices
+    if len(docs) >= shards:
+        docs = docs[shard::shards]
+    
+    return docs
+
+
+def get_quiz_context(vectorstore, source_file: Optional[str] = None, shard: int = 0, shards: int = 1,
+                     rotation: int = 0) -> str:
+    """Get the quiz context text for the whole corpus or one file (see get_quiz_docs)."""
+    docs = get_quiz_docs(vectorstore, source_file, shard, shards, rotation)
+    return "\n\n".join(doc.page_content for doc in docs)
 
 
 def get_available_files(vectorstore) -> list:
     """Get list of unique source files in the vectorstore."""
     try:
-        # Get all documents from vectorstore
-        all_docs = vectorstore.docstore._dict.values()
-        
-        # Extract unique source files
-        source_files = set()
-        for doc in all_docs:
-            if "source_file" in doc.metadata:
-                source_files.add(doc.metadata["source_file"])
-        
-        return sorted(list(source_files))
-    except:
+        return sorted(get_file_catalog(vectorstore))
+    except Exception:
         return []
 
 
-def build_quiz_chain_for_file(llm, vectorstore, source_file: str, num_questions: int = 5):
-    """Builds a chain for generating multiple-choice questions from a specific file."""
+def build_quiz_chain_for_file(llm, vectorstore, source_file: str, num_questions: int = 5, structured: bool = False):
+    """Builds a chain for generating multiple-choice questions from a specific file.
+    
+    With structured=True the chain returns a list of Question objects
+    (streamed one question at a time) instead of quiz text.
+    """
+    from langchain_core.prompts import ChatPromptTemplate
     
     quiz_prompt = ChatPromptTemplate.from_template("""
     You are a test generator. Based on the following content from "{source_file}", create {num_questions} multiple-choice questions.
@@ -291,29 +1098,198 @@ def build_quiz_chain_for_file(llm, vectorstore, source_file: str, num_questions:
     
     Generate {num_questions} multiple-choice questions:""")
 
-    # Create a filtered retriever for specific file
-    def get_file_specific_docs(query):
-        # Get more documents to ensure we have enough from the specific file
-        all_results = vectorstore.similarity_search(query, k=20)
+    return _build_sharded_quiz_chain(llm, quiz_prompt, vectorstore, source_file, structured)
+
+
+def _quiz_pool_fingerprint(source_file: Optional[str] = None) -> str:
+    """Fingerprint the chunks a quiz pool is generated from (one file or all files)."""
+    if source_file is None:
+        chunk_ids = [i for entry in _catalog.values() for i in entry["chunk_ids"]]
+    else:
+        chunk_ids = _catalog.get(source_file, {}).get("chunk_ids", [])
+    return hashlib.sha1("\n".join(sorted(chunk_ids)).encode('utf-8')).hexdigest()
+
+
+def start_quiz_bank(llm, vectorstore, target: int = QUIZ_BANK_SIZE) -> Optional[QuizBank]:
+    """Open the on-disk quiz bank for the active index and start filling it.
+    
+    A background thread keeps the pool for the whole corpus topped up to
+    `target` questions, so quizzes can be served instantly by take_bank_quiz.
+    A file gets its own pool once it has been quizzed; only the
+    QUIZ_BANK_FILE_POOLS most recently quizzed files are kept filled.
+    Only the active (cached) vectorstore has a bank.
+    """
+    global _quiz_bank, _quiz_bank_filler
+    
+    stop_quiz_bank()
+    
+    if target <= 0 or vectorstore is not _vectorstore or not _catalog:
+        return None
+    
+    bank_path = os.path.join(get_cache_dir(INDEX_CACHE_DIR, _current_pdf), QUIZ_BANK_FILE)
+    _quiz_bank = QuizBank(bank_path)
+    
+    def generator(source_file):
+        if source_file is None:
+            chain = build_quiz_chain(llm, vectorstore, structured=True)
+        else:
+            chain = build_quiz_chain_for_file(llm, vectorstore, source_file, structured=True)
+        return lambda n: chain.invoke(str(n))
+    
+    targets = [(ALL_FILES, _quiz_pool_fingerprint(), generator(None))]
+    on_demand = {
+        source_file: (_quiz_pool_fingerprint(source_file), generator(source_file))
+        for source_file in sorted(_catalog)
+    }
+    
+    _quiz_bank_filler = QuizBankFiller(_quiz_bank, targets, target, on_demand, QUIZ_BANK_FILE_POOLS)
+    _quiz_bank_filler.start()
+    return _quiz_bank
+
+
+def stop_quiz_bank():
+    """Stop the background quiz bank filler, if running."""
+    global _quiz_bank_filler
+    
+    if _quiz_bank_filler is not None:
+        _quiz_bank_filler.stop()
+        _quiz_bank_filler = None
+
+
+def take_bank_quiz(vectorstore, num_questions: int, source_file: Optional[str] = None) -> list:
+    """Serve num_questions pre-generated questions, or [] if the bank cannot cover them."""
+    if _quiz_bank is None or vectorstore is not _vectorstore:
+        return []
+    
+    pool = ALL_FILES if source_file is None else source_file
+    questions = _quiz_bank.take(pool, _quiz_pool_fingerprint(source_file), num_questions)
+    
+    if _quiz_bank_filler is not None:
+        if source_file is not None:
+            _quiz_bank_filler.demand(source_file)
+        _quiz_bank_filler.wake()
+    return questions
+
+
+def plan_quiz_shards(num_questions: int, shard_size: int = QUIZ_SHARD_SIZE) -> list:
+    """Split a question count into shard sizes, e.g. 12 -> [5, 5, 2]."""
+    shard_size = max(1, shard_size)
+    return [min(shard_size, num_questions - start) for start in range(0, num_questions, shard_size)] or [num_questions]
+
+
+_QUESTION_NUMBER = re.compile(r"^(\s*)Q\d+(\s*[:.])", re.MULTILINE)
+
+
+def renumber_questions(text: str, start: int) -> tuple:
+    """Renumber 'Q<n>:' headings from `start`; returns (text, next number)."""
+    counter = [start]
+    
+    def replace(match):
+        number = counter[0]
+        counter[0] += 1
+        return f"{match.group(1)}Q{number}{match.group(2)}"
+    
+    return _QUESTION_NUMBER.sub(replace, text.strip()), counter[0]
+
+
+def _limit_questions(chunks, limit: int):
+    """Pass quiz text chunks through, stopping before question number `limit + 1`.
+    
+    Text is released line by line, so a heading split across chunks is
+    still recognised before any of it is emitted.
+    """
+    text = ""
+    emitted = 0
+    for chunk in chunks:
+        text += chunk
+        headings = list(_QUESTION_NUMBER.finditer(text))
+        if len(headings) > limit:
+            yield text[emitted:headings[limit].start()].rstrip()
+            return
+        line_end = text.rfind("\n") + 1
+        if line_end > emitted:
+            yield text[emitted:line_end]
+            emitted = line_end
+    if len(text) > emitted:
+        yield text[emitted:]
+
+
+def _build_sharded_quiz_chain(llm, quiz_prompt, vectorstore, source_file: Optional[str] = None, structured: bool = False):
+    """Build a quiz chain that splits large question counts into parallel shards.
+    
+    The chain takes the number of questions as input. Up to QUIZ_SHARD_SIZE
+    questions are generated by a single LLM call (and stream token by token);
+    larger requests are split into shards, each over its own slice of the
+    context, generated concurrently and merged in order with the questions
+    renumbered. Latency then scales with the shard size, not the total count.
+    Questions beyond what a call was asked for are dropped.
+    
+    With structured=True each shard's output is parsed into Question objects
+    as it arrives; the chain streams one-item lists, so invoke() returns
+    the full list of questions.
+    """
+    from langchain_core.output_parsers import StrOutputParser
+    from langchain_core.runnables import RunnableLambda, RunnableGenerator
+    
+    
+    def shard_chain(shard: int, shards: int, rotation: int):
+        return (
+            {
+                "context": lambda x: get_quiz_context(vectorstore, source_file, shard, shards, rotation), 
+                "num_questions": lambda x: x,
+                "source_file": lambda x: source_file
+            }
+            | quiz_prompt
+            | llm
+            | StrOutputParser()
+        )
+    
+    def quiz(num_questions):
+        num_questions = int(num_questions)
+        sizes = plan_quiz_shards(num_questions)
+        rotation = next_quiz_rotation(vectorstore, source_file, len(sizes))
+        
+        def shard_outputs():
+            # (shard, text chunks) in shard order; a single shard keeps streaming
+            if len(sizes) == 1:
+                yield 0, _limit_questions(shard_chain(0, 1, rotation).stream(str(num_questions)), num_questions)
+                return
+            
+            with ThreadPoolExecutor(max_workers=max(1, min(QUIZ_MAX_CONCURRENCY, len(sizes)))) as executor:
+                futures = [
+                    executor.submit(shard_chain(shard, len(sizes), rotation).invoke, str(size))
+                    for shard, size in enumerate(sizes)
+                ]
+                
+                # Emit shards in order as soon as each one (and those before it) is done
+                for shard, future in enumerate(futures):
+                    yield shard, _limit_questions([future.result()], sizes[shard])
+        
+        def generate_text(_):
+            if len(sizes) == 1:
+                yield from next(shard_outputs())[1]
+                return
+            
+            next_number = 1
+            for shard, chunks in shard_outputs():
+                text, next_number = renumber_questions("".join(chunks), next_number)
+                yield text if shard == 0 else "\n\n" + text
         
-        # Filter for specific file
-        file_docs = [doc for doc in all_results if doc.metadata.get("source_file") == source_file]
+        def generate_questions(_):
+            for shard, chunks in shard_outputs():
+                docs = get_quiz_docs(vectorstore, source_file, shard, len(sizes), rotation)
+                parser = QuizParser(doc.id for doc in docs if doc.id)
+                count = 0
+                for chunk in chunks:
+                    for question in parser.feed(chunk):
+                        if count < sizes[shard]:
+                            count += 1
+                            yield [question]
+                for question in parser.close():
+                    if count < sizes[shard]:
+                        count += 1
+                        yield [question]
         
-        # Take top 8 from the specific file
-        return file_docs[:8]
-    
-    def format_docs(docs):
-        return "\n\n".join(doc.page_content for doc in docs)
-    
-    chain = (
-        {
-            "context": lambda x: format_docs(get_file_specific_docs("summary overview main topics")), 
-            "num_questions": lambda x: x,
-            "source_file": lambda x: source_file
-        }
-        | quiz_prompt
-        | llm
-        | StrOutputParser()
-    )
+        return RunnableGenerator(generate_questions if structured else generate_text)
     
-    return chain
+    return RunnableLambda(quiz)